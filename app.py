@@ -1,19 +1,285 @@
 # app.py
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from pathlib import Path
-import requests
+import atexit
 import logging
-from pddl_generator import generate_pddl_from_instruction
+import os
+import re
+import threading
+import time
+import uuid
+from artifacts import ArtifactStore
+from collections import OrderedDict
+from batch import generate_many, get_pool, iter_ndjson, parse_instruction
+from cache import LRUCache
+from incremental import SessionStore
+from jobs import JobQueue, QueueFull
+from lexicon import LexiconError, SNAPSHOT_PATH, SOURCE_DIR, SOURCES
+from pddl_generator import (
+    build_plan_steps, coalesce, current_lexicon, generate_pddl_from_instruction, generate_stages,
+    iter_domain_chunks, iter_problem_chunks, normalize, reload_lexicon, tokenize,
+)
+from pddl_parser import PDDLParseError
+from plan_cache import PlanCache
+from solver_client import UNAVAILABLE_ERROR, cacheable, make_client
+from step_ir import Step, dumps
+from validator import validate_result
+import metrics
+import planner
+
+class JSONProvider(DefaultJSONProvider):
+    ensure_ascii = False
+
+    @staticmethod
+    def default(o):
+        # meta["steps"] holds Step records
+        if isinstance(o, Step):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
 
 app = Flask(__name__, template_folder="templates", static_folder="static")
+app.json = JSONProvider(app)
 CORS(app)
 logging.basicConfig(level=logging.INFO)
 
+# defaults; override with FLASK_<NAME> environment variables (e.g. FLASK_GENERATE_CACHE_BYTES=1000000)
+app.config.update(
+    GENERATE_CACHE_BYTES=64 * 1024 * 1024,
+    GENERATE_CACHE_TTL=24 * 3600,  # seconds
+    GENERATE_CACHE_FILE=None,  # e.g. "output/generate_cache.pickle" to keep warm entries across restarts
+    PLAN_CACHE_FILE="output/plans.sqlite3",  # shared by all worker processes
+    PLAN_CACHE_BYTES=256 * 1024 * 1024,
+    SOLVE_WORKERS=2,
+    SOLVE_MAX_PENDING=16,  # queued + running jobs before /solve answers 429
+    SOLVE_TIME_BUDGET=10,  # seconds per job
+    SOLVE_MEMORY_BUDGET=256 * 1024 * 1024,  # bytes of search states per job
+    SOLVE_ORDERED=False,  # default for "ordered": solve goals one step at a time, in order
+    BATCH_WORKERS=None,  # processes for /generate/batch (None = all cores)
+    GENERATE_FILE_MAX_QUERY=2048,  # longest instruction accepted in a query string (GET /generate/<kind>.pddl, /stream)
+    ARTIFACT_DIR="output/artifacts",  # content-addressed domain/problem files served by /download/<id>
+    ARTIFACT_MAX_BYTES=512 * 1024 * 1024,
+    ARTIFACT_MAX_AGE=7 * 24 * 3600,  # seconds since the file was written
+    ARTIFACT_GC_INTERVAL=300,  # seconds between collections (run by the writer thread)
+    PROFILE_REQUESTS=False,  # allow ?profile=1 (sampling profiler, see /profile/<id>)
+    PROFILE_INTERVAL=0.005,  # seconds between stack samples
+    PROFILE_HISTORY=32,  # profiles kept in memory
+    LEXICON_SNAPSHOT=None,  # compiled lexicon (lexicon.py); None = lexicons/compiled.snap, rebuilt when lexicons/ changes
+    LEXICON_WATCH_INTERVAL=0,  # seconds between checks for a new snapshot (0 = only POST /lexicon/reload)
+    INCREMENTAL_SESSIONS=1024,  # live-preview sessions kept for /generate/incremental
+    INCREMENTAL_SESSION_TTL=1800,  # seconds of inactivity before a session is dropped
+    SOLVER_BACKEND="local",  # "local" (in-process planner) or "http" (planning.domains API at SOLVER_URL)
+    SOLVER_URL="http://127.0.0.1:8001/solve",  # python solver_server.py, or https://solver.planning.domains/solve
+    SOLVER_POOL_SIZE=8,  # keep-alive connections to the http backend
+    SOLVER_MAX_IN_FLIGHT=8,  # concurrent http solve requests per process
+    SOLVER_RETRIES=2,  # retries per solve on network errors, timeouts and 5xx/429
+    SOLVER_BACKOFF=0.1,  # seconds, base of the jittered exponential backoff
+    SOLVER_ATTEMPT_TIMEOUT=10,  # seconds, cap for a single http attempt
+    SOLVER_BREAKER_FAILURES=5,  # consecutive failures that open the circuit
+    SOLVER_BREAKER_RESET=30,  # seconds before an open circuit lets a probe through
+    SOLVER_FAILOVER=True,  # solve locally while the http backend is failing
+    SOLVER_FAILOVER_BUDGET=1,  # seconds of each solve budget kept for the local fallback (at most half)
+)
+app.config.from_prefixed_env()
+
 OUTPUT = Path("output")
 OUTPUT.mkdir(exist_ok=True)
 
-SOLVER_URL = "https://solver.planning.domains/solve"  # public solver
+# instruction-level cache in front of generate_pddl_from_instruction, keyed by lexicon version + normalized text
+GENERATE_CACHE = LRUCache(
+    max_bytes=app.config["GENERATE_CACHE_BYTES"],
+    ttl=app.config["GENERATE_CACHE_TTL"],
+    path=app.config["GENERATE_CACHE_FILE"],
+)
+atexit.register(GENERATE_CACHE.save)
+
+# solved plans keyed by the canonical (domain, problem) hash
+PLAN_CACHE = PlanCache(app.config["PLAN_CACHE_FILE"], max_bytes=app.config["PLAN_CACHE_BYTES"])
+
+SOLVE_JOBS = JobQueue(
+    workers=app.config["SOLVE_WORKERS"],
+    max_pending=app.config["SOLVE_MAX_PENDING"],
+    time_budget=app.config["SOLVE_TIME_BUDGET"],
+    memory_budget=app.config["SOLVE_MEMORY_BUDGET"],
+)
+
+# generated PDDL by content hash; writes happen off the request thread
+ARTIFACTS = ArtifactStore(
+    app.config["ARTIFACT_DIR"],
+    max_bytes=app.config["ARTIFACT_MAX_BYTES"],
+    max_age=app.config["ARTIFACT_MAX_AGE"],
+    gc_interval=app.config["ARTIFACT_GC_INTERVAL"],
+)
+atexit.register(ARTIFACTS.flush)
+
+# solve backend: the local planner, or a remote one with retries, circuit breaker and local failover
+SOLVER = make_client(
+    backend=app.config["SOLVER_BACKEND"],
+    url=app.config["SOLVER_URL"],
+    pool_size=app.config["SOLVER_POOL_SIZE"],
+    max_in_flight=app.config["SOLVER_MAX_IN_FLIGHT"],
+    retries=app.config["SOLVER_RETRIES"],
+    backoff=app.config["SOLVER_BACKOFF"],
+    attempt_timeout=app.config["SOLVER_ATTEMPT_TIMEOUT"],
+    breaker_failures=app.config["SOLVER_BREAKER_FAILURES"],
+    breaker_reset=app.config["SOLVER_BREAKER_RESET"],
+    failover=app.config["SOLVER_FAILOVER"],
+    fallback_budget=app.config["SOLVER_FAILOVER_BUDGET"],
+)
+
+# last generated revision per live-preview session (see incremental.py)
+INCREMENTAL_SESSIONS = SessionStore(
+    max_sessions=app.config["INCREMENTAL_SESSIONS"],
+    ttl=app.config["INCREMENTAL_SESSION_TTL"],
+)
+
+# -------------------------
+# Lexicon hot reload
+# -------------------------
+# A reload builds the new Lexicon aside and swaps one reference; requests
+# already running finish with the one they started with. Generated results
+# are cached per lexicon version, so nothing stale is served after a swap.
+LEXICON_RELOADS = metrics.counter("lexicon_reloads_total", "Lexicon reload attempts.", ["result"])
+metrics.gauge("lexicon_info", "Active lexicon snapshot.", ["version"], callback=lambda: {(current_lexicon().version,): 1})
+
+def do_reload_lexicon():
+    try:
+        lex, changed = reload_lexicon(app.config["LEXICON_SNAPSHOT"])
+    except (OSError, LexiconError):
+        LEXICON_RELOADS.inc(result="error")
+        raise
+    LEXICON_RELOADS.inc(result="changed" if changed else "unchanged")
+    if changed:
+        logging.info("Lexicon %s loaded from %s", lex.version, lex.path or SOURCE_DIR)
+    return lex, changed
+
+def _lexicon_stamp():
+    path = app.config["LEXICON_SNAPSHOT"]
+    paths = [path] if path else [SNAPSHOT_PATH] + [os.path.join(SOURCE_DIR, name) for name in SOURCES]
+    stamp = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+def _watch_lexicon(interval):
+    stamp = _lexicon_stamp()
+    while True:
+        time.sleep(interval)
+        current = _lexicon_stamp()
+        if current == stamp:
+            continue
+        stamp = current
+        try:
+            do_reload_lexicon()
+        except Exception:
+            logging.exception("Lexicon reload failed; keeping %s", current_lexicon().version)
+
+if app.config["LEXICON_SNAPSHOT"]:
+    do_reload_lexicon()
+if app.config["LEXICON_WATCH_INTERVAL"]:
+    threading.Thread(target=_watch_lexicon, args=(app.config["LEXICON_WATCH_INTERVAL"],),
+                     name="lexicon-watcher", daemon=True).start()
+
+# -------------------------
+# Metrics (Prometheus text on /metrics) and per-request profiling
+# -------------------------
+HTTP_SECONDS = metrics.histogram(
+    "http_request_seconds", "Request latency by route (streamed bodies: until headers).", ["method", "route", "status"])
+PLAN_CACHE_REQUESTS = metrics.counter("plan_cache_requests_total", "Plan cache lookups.", ["result"])
+SOLVE_SECONDS = metrics.histogram("solve_seconds", "Planner wall time per job.", ["outcome"])
+SOLVE_FAILURES = metrics.counter("solve_failures_total", "Solve jobs without a plan.", ["reason"])
+VALIDATE_SECONDS = metrics.histogram("plan_validate_seconds", "Plan validation time.")
+INVALID_PLANS = metrics.counter("invalid_plans_total", "Plans rejected by the validator.", ["source"])
+metrics.counter("generate_cache_hits_total", "Instruction cache hits.", callback=lambda: GENERATE_CACHE.stats()["hits"])
+metrics.counter("generate_cache_misses_total", "Instruction cache misses.", callback=lambda: GENERATE_CACHE.stats()["misses"])
+metrics.gauge("generate_cache_bytes", "Instruction cache size.", callback=lambda: GENERATE_CACHE.stats()["bytes"])
+metrics.gauge("incremental_sessions", "Live-preview sessions in memory.", callback=lambda: len(INCREMENTAL_SESSIONS))
+metrics.gauge("solver_circuit_open", "1 while the solver circuit breaker is open or half-open.",
+              callback=lambda: int(SOLVER.stats().get("circuit", "closed") != "closed"))
+metrics.gauge("solve_queue_depth", "Queued plus running solve jobs.", callback=SOLVE_JOBS.depth)
+metrics.gauge("artifact_pending_writes", "Artifacts not yet on disk.", callback=lambda: ARTIFACTS.stats()["pending"])
+
+STOP_REASONS = {message: reason for reason, message in planner.STOP_ERRORS.items()}
+STOP_REASONS[planner.UNREACHABLE_ERROR] = "unreachable"
+INVALID_PLAN_ERROR = "invalid plan"
+STOP_REASONS[INVALID_PLAN_ERROR] = "invalid"
+STOP_REASONS[UNAVAILABLE_ERROR] = "unavailable"
+PROFILES = OrderedDict()  # profile id -> collapsed stacks, newest last
+PROFILES_LOCK = threading.Lock()
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    if app.config["PROFILE_REQUESTS"] and request.args.get("profile") == "1":
+        g.profiler = metrics.SamplingProfiler(interval=app.config["PROFILE_INTERVAL"]).start()
+
+@app.after_request
+def record_request(response):
+    rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    HTTP_SECONDS.observe(time.perf_counter() - g.request_start,
+                         method=request.method, route=rule, status=response.status_code)
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+        profile_id = uuid.uuid4().hex
+        collapsed = profiler.collapsed()
+        with PROFILES_LOCK:
+            PROFILES[profile_id] = collapsed
+            while len(PROFILES) > app.config["PROFILE_HISTORY"]:
+                PROFILES.popitem(last=False)
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/profile/<profile_id>")
+def profile(profile_id):
+    """
+    Pilas muestreadas de una petición hecha con ?profile=1, en formato
+    "collapsed" (flamegraph.pl / speedscope).
+    """
+    with PROFILES_LOCK:
+        collapsed = PROFILES.get(profile_id)
+    if collapsed is None:
+        return jsonify({"error": "unknown profile"}), 404
+    return Response(collapsed, mimetype="text/plain")
+
+@app.route("/lexicon", methods=["GET"])
+def lexicon_info():
+    return jsonify(current_lexicon().info())
+
+@app.route("/lexicon/reload", methods=["POST"])
+def lexicon_reload():
+    """
+    Vuelve a cargar el snapshot (LEXICON_SNAPSHOT, o el de lexicons/
+    recompilado si las fuentes cambiaron). Si falla, sigue el anterior.
+    """
+    try:
+        lex, changed = do_reload_lexicon()
+    except (OSError, LexiconError) as e:
+        return jsonify({"error": str(e), "version": current_lexicon().version}), 500
+    return jsonify(dict(lex.info(), changed=changed))
+
+def generate_key(instr, lex):
+    return f"{lex.version}:{normalize(instr)}"
+
+def generate_cached(instr):
+    lex = current_lexicon()
+    key = generate_key(instr, lex)
+    result = GENERATE_CACHE.get(key)
+    if result is None:
+        result = generate_pddl_from_instruction(instr, lex)
+        GENERATE_CACHE.put(key, result)
+        return result
+    # same normalized text, possibly different raw spelling
+    return dict(result, meta=dict(result["meta"], raw=instr))
 
 @app.route("/")
 def index():
@@ -26,40 +292,359 @@ def generate():
     if not instr:
         return jsonify({"error": "No instruction provided"}), 400
 
-    result = generate_pddl_from_instruction(instr)
+    result = generate_cached(instr)
     domain = result["domain"]
     problem = result["problem"]
     meta = result["meta"]
+    ids = save_outputs(domain, problem)
+
+    return jsonify(dict(ids, domain=domain, problem=problem, meta=meta)), 200
+
+@app.route("/generate/batch", methods=["POST"])
+def generate_batch():
+    """
+    Cuerpo: array JSON o NDJSON (una instrucción por línea, cadena u objeto
+    {"instruction": ...}). Respuesta: NDJSON en orden de entrada, una línea
+    {"index", "domain", "problem", "meta"} o {"index", "error"} por instrucción.
+    """
+    if request.mimetype in ("application/x-ndjson", "application/jsonl", "text/plain"):
+        # read the body line by line so memory stays flat for huge batches
+        instructions = iter_ndjson(iter(request.stream.readline, b""))
+    else:
+        data = request.get_json(force=True, silent=True)
+        if not isinstance(data, list):
+            return jsonify({"error": "expected a JSON array or an NDJSON body"}), 400
+        instructions = (_safe_instruction(item) for item in data)
+
+    def lines():
+        for index, result in generate_many(instructions, executor=get_pool(app.config["BATCH_WORKERS"])):
+            yield dumps(dict(result, index=index)) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
 
-    # Save files for download
-    dpath = OUTPUT / "domain.pddl"
-    ppath = OUTPUT / "problem.pddl"
-    dpath.write_text(domain, encoding="utf-8")
-    ppath.write_text(problem, encoding="utf-8")
+@app.route("/generate/incremental", methods=["POST"])
+def generate_incremental():
+    """
+    Vista previa mientras se escribe. Cuerpo: {instruction, session, base}
+    (session y base, la revisión que tiene el cliente, de la respuesta
+    anterior). Solo se analizan los pasos que cambiaron; si base coincide
+    con la revisión de la sesión la respuesta trae domain_diff/problem_diff
+    ([i1, i2, líneas] sobre las líneas de base) en lugar de domain/problem.
+    No guarda descargas: para eso, /generate.
+    """
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    instr = data.get("instruction", "")
+    if not isinstance(instr, str) or not instr.strip():
+        return jsonify({"error": "No instruction provided"}), 400
+    session = data.get("session")
+    base = data.get("base")
+    if not isinstance(session, (str, type(None))) or not isinstance(base, (int, type(None))):
+        return jsonify({"error": "session must be a string and base an integer"}), 400
+    return jsonify(INCREMENTAL_SESSIONS.update(session, base, instr, current_lexicon()))
+
+@app.route("/generate/<kind>.pddl", methods=["GET", "POST"])
+def generate_file(kind):
+    """
+    POST /generate/problem.pddl (o domain.pddl) con la instrucción en el
+    cuerpo, como JSON {"instruction": ...} o texto plano: el PDDL se emite
+    por chunks mientras se construye, sin montar el texto entero; para
+    instrucciones enormes que no caben cómodamente en /generate. GET
+    ?instruction=... solo para instrucciones cortas (la línea de petición
+    tiene límite en los servidores y proxies).
+    """
+    if kind not in ("domain", "problem"):
+        return jsonify({"error": "unknown file"}), 404
+    if request.method == "GET":
+        instr = request.args.get("instruction", "")
+        if len(instr) > app.config["GENERATE_FILE_MAX_QUERY"]:
+            return jsonify({"error": "instruction too long for a query string; POST it in the body"}), 414
+    elif request.mimetype == "application/json":
+        data = request.get_json(silent=True)
+        instr = data.get("instruction", "") if isinstance(data, dict) else None
+        if not isinstance(instr, str):
+            return jsonify({"error": "expected a JSON object with a string 'instruction'"}), 400
+    else:
+        instr = request.get_data(as_text=True)
+    if not instr.strip():
+        return jsonify({"error": "No instruction provided"}), 400
+    lex = current_lexicon()
+    text, tokens = tokenize(instr)
+    steps = build_plan_steps(text, tokens, lex)
+    if kind == "domain":
+        chunks = iter_domain_chunks(s.action for s in steps)
+    else:
+        chunks = iter_problem_chunks(steps, lex)
+    headers = {"Content-Disposition": f'attachment; filename="{kind}.pddl"'}
+    return Response(stream_with_context(coalesce(chunks)), mimetype="text/plain", headers=headers)
+
+def _safe_instruction(item):
+    try:
+        return parse_instruction(item)
+    except ValueError as e:
+        return e
+
+def save_outputs(domain, problem):
+    # Save files for download; identical texts share one file, concurrent requests never clobber each other
+    return {"domain_id": ARTIFACTS.put(domain), "problem_id": ARTIFACTS.put(problem)}
+
+def check_plan(domain, problem, result, ordered, source):
+    """
+    Simula el plan de result (validator.py) y adjunta el informe en
+    result["result"]["validation"]. Salida: False si el plan no es válido.
+    """
+    with VALIDATE_SECONDS.time():
+        report = validate_result(domain, problem, result, ordered)
+    if report is None:
+        return True
+    result["result"]["validation"] = report
+    if not report["valid"]:
+        INVALID_PLANS.inc(source=source)
+        logging.warning("Invalid plan from %s: %s", source, report)
+    return report["valid"]
 
-    return jsonify({"domain": domain, "problem": problem, "meta": meta}), 200
+def cached_plan(key, domain, problem, ordered):
+    """
+    Plan en caché ya validado; uno que ya no valida se borra y cuenta como fallo.
+    """
+    cached = PLAN_CACHE.get(key)
+    if cached is not None and not check_plan(domain, problem, cached, ordered, "cache"):
+        PLAN_CACHE.delete(key)
+        cached = None
+    PLAN_CACHE_REQUESTS.inc(result="miss" if cached is None else "hit")
+    return cached
+
+def run_solve_job(job, domain, problem, key, ordered=False):
+    started = time.perf_counter()
+    try:
+        result = SOLVER.solve(
+            domain, problem,
+            timeout=job.time_budget,
+            cancel=job.cancel_event,
+            max_bytes=job.memory_budget,
+            on_progress=lambda stats: job.progress.update(expanded=stats["expanded"], best_h=stats["best_h"]),
+            ordered=ordered,
+        )
+    except Exception:
+        SOLVE_SECONDS.observe(time.perf_counter() - started, outcome="exception")
+        SOLVE_FAILURES.inc(reason="exception")
+        raise
+    if not check_plan(domain, problem, result, ordered, "solver"):
+        result = {"status": "error", "result": dict(result["result"], error=INVALID_PLAN_ERROR)}
+    error = result["result"].get("error")
+    outcome = "ok" if result["status"] == "ok" else STOP_REASONS.get(error, "unsolvable")
+    SOLVE_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+    if outcome != "ok":
+        SOLVE_FAILURES.inc(reason=outcome)
+    # plans and local deterministic errors only: a remote solver's timeout or overload is not a property of the problem
+    if error != INVALID_PLAN_ERROR and cacheable(result):
+        PLAN_CACHE.put(key, result)
+    return result
 
 @app.route("/solve", methods=["POST"])
 def solve():
+    """
+    Encola la resolución y devuelve el id del trabajo (202); si el plan ya
+    está en caché el trabajo nace terminado (200). Cola llena -> 429.
+    "ordered": true resuelve las metas una tras otra, en el orden del problem.
+    """
     data = request.get_json(force=True)
     domain = data.get("domain")
     problem = data.get("problem")
     if not domain or not problem:
         return jsonify({"error": "domain and problem required"}), 400
+    ordered = bool(data.get("ordered", app.config["SOLVE_ORDERED"]))
 
-    payload = {"domain": domain, "problem": problem}
     try:
-        r = requests.post(SOLVER_URL, json=payload, timeout=30)
-        r.raise_for_status()
-        return jsonify(r.json()), 200
-    except Exception as e:
-        logging.exception("Solver error")
-        return jsonify({"error": "solver request failed", "detail": str(e)}), 502
-
-@app.route("/download/<path:filename>")
-def download(filename):
-    # safe serve from output folder
-    return send_from_directory(str(OUTPUT.resolve()), filename, as_attachment=True)
+        key = PLAN_CACHE.key(domain, problem, ordered)
+    except PDDLParseError as e:
+        return jsonify({"error": "invalid PDDL", "detail": str(e)}), 400
+    cached = cached_plan(key, domain, problem, ordered)
+    if cached is not None:
+        cached["result"]["cached"] = True
+        return jsonify(SOLVE_JOBS.finished(cached).to_dict()), 200
+    try:
+        job = SOLVE_JOBS.submit(run_solve_job, domain, problem, key, ordered)
+    except QueueFull as e:
+        resp = jsonify({"error": "solver busy, retry later"})
+        resp.headers["Retry-After"] = str(e.retry_after)
+        return resp, 429
+    return jsonify(job.to_dict()), 202
+
+@app.route("/solve/<job_id>", methods=["GET"])
+def solve_status(job_id):
+    job = SOLVE_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route("/solve/<job_id>", methods=["DELETE"])
+def solve_cancel(job_id):
+    job = SOLVE_JOBS.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job.to_dict()), 200
+
+# -------------------------
+# Server-sent events: generation + solve progress
+# -------------------------
+STREAM_POLL_INTERVAL = 0.1  # seconds between job progress checks
+STREAM_REQUEST_TTL = 60  # seconds a POSTed /stream request waits for its EventSource
+STREAM_REQUEST_MAX = 1024  # pending POSTed /stream requests kept
+STREAM_REQUESTS = OrderedDict()  # stream id -> (created, instruction, want_plan, ordered), oldest first
+STREAM_REQUESTS_LOCK = threading.Lock()
+
+def sse(event, data):
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+def iter_generation(instr):
+    """
+    (stage, value) como generate_stages, sirviendo desde GENERATE_CACHE si
+    la instrucción ya se generó.
+    """
+    lex = current_lexicon()
+    key = generate_key(instr, lex)
+    result = GENERATE_CACHE.get(key)
+    if result is not None:
+        yield "steps", result["meta"]["steps"]
+        yield "domain", result["domain"]
+        yield "problem", result["problem"]
+        yield "result", dict(result, meta=dict(result["meta"], raw=instr))
+        return
+    for stage, value in generate_stages(instr, lex):
+        if stage == "result":
+            GENERATE_CACHE.put(key, value)
+        yield stage, value
+
+@app.route("/stream", methods=["POST"])
+def stream_create():
+    """
+    Cuerpo: {instruction, solve, ordered} (solve y ordered booleanos
+    opcionales). Responde 201 {stream_id, url}; el EventSource se abre en
+    url (GET /stream/<id>, de un solo uso, caduca a los
+    STREAM_REQUEST_TTL segundos). Así la instrucción viaja en el cuerpo y
+    no en la línea de petición, que tiene límite en servidores y proxies.
+    """
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    instr = data.get("instruction", "")
+    if not isinstance(instr, str) or not instr.strip():
+        return jsonify({"error": "No instruction provided"}), 400
+    want_plan = data.get("solve", True) is not False
+    ordered = bool(data.get("ordered", app.config["SOLVE_ORDERED"]))
+    stream_id = uuid.uuid4().hex
+    now = time.time()
+    with STREAM_REQUESTS_LOCK:
+        while STREAM_REQUESTS:
+            oldest = next(iter(STREAM_REQUESTS.values()))
+            if len(STREAM_REQUESTS) < STREAM_REQUEST_MAX and now - oldest[0] <= STREAM_REQUEST_TTL:
+                break
+            STREAM_REQUESTS.popitem(last=False)
+        STREAM_REQUESTS[stream_id] = (now, instr, want_plan, ordered)
+    return jsonify({"stream_id": stream_id, "url": f"/stream/{stream_id}"}), 201
+
+@app.route("/stream/<stream_id>", methods=["GET"])
+def stream_open(stream_id):
+    with STREAM_REQUESTS_LOCK:
+        pending = STREAM_REQUESTS.pop(stream_id, None)
+    if pending is None or time.time() - pending[0] > STREAM_REQUEST_TTL:
+        return jsonify({"error": "unknown or expired stream"}), 404
+    return stream_events(*pending[1:])
+
+@app.route("/stream", methods=["GET"])
+def stream():
+    """
+    GET /stream?instruction=... para instrucciones cortas (hasta
+    GENERATE_FILE_MAX_QUERY caracteres); las largas van por POST /stream.
+    """
+    instr = request.args.get("instruction", "")
+    if not instr:
+        return jsonify({"error": "No instruction provided"}), 400
+    if len(instr) > app.config["GENERATE_FILE_MAX_QUERY"]:
+        return jsonify({"error": "instruction too long for a query string; POST it to /stream"}), 414
+    want_plan = request.args.get("solve", "1") != "0"
+    ordered = request.args.get("ordered", "1" if app.config["SOLVE_ORDERED"] else "0") == "1"
+    return stream_events(instr, want_plan, ordered)
+
+def stream_events(instr, want_plan, ordered):
+    """
+    SSE: steps -> domain -> problem -> meta -> artifacts -> progress* -> plan (o error).
+    Sin want_plan se detiene tras la generación; ordered resuelve paso a paso
+    (ver /solve). Si el cliente se desconecta el trabajo de resolución se
+    cancela.
+    """
+
+    def events():
+        for stage, value in iter_generation(instr):
+            if stage == "result":
+                result = value
+                yield sse("meta", result["meta"])
+            else:
+                yield sse(stage, value)
+        yield sse("artifacts", save_outputs(result["domain"], result["problem"]))
+        if not want_plan:
+            yield sse("done", {})
+            return
+
+        key = PLAN_CACHE.key(result["domain"], result["problem"], ordered)
+        cached = cached_plan(key, result["domain"], result["problem"], ordered)
+        if cached is not None:
+            cached["result"]["cached"] = True
+            yield sse("plan", cached)
+            yield sse("done", {})
+            return
+        try:
+            job = SOLVE_JOBS.submit(run_solve_job, result["domain"], result["problem"], key, ordered)
+        except QueueFull as e:
+            yield sse("error", {"error": "solver busy, retry later", "retry_after": e.retry_after})
+            return
+        yield sse("job", {"job_id": job.id})
+        last = None
+        try:
+            while not job.future.done():
+                if job.progress and job.progress != last:
+                    last = dict(job.progress)
+                    yield sse("progress", last)
+                time.sleep(STREAM_POLL_INTERVAL)
+        except GeneratorExit:
+            SOLVE_JOBS.cancel(job.id)
+            raise
+        if job.status == "done":
+            yield sse("plan", job.result)
+        else:
+            yield sse("error", job.to_dict())
+        yield sse("done", {})
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+ARTIFACT_ID = re.compile(r"[0-9a-f]{64}")
+ARTIFACT_MAX_AGE_HEADER = 365 * 24 * 3600  # the content behind an id never changes
+
+@app.route("/download/<artifact_id>")
+def download(artifact_id):
+    """
+    Sirve un PDDL por su id (sha256). ETag = id, así If-None-Match responde
+    304 sin leer el fichero. ?name= fija el nombre de la descarga.
+    """
+    if not ARTIFACT_ID.fullmatch(artifact_id):
+        return jsonify({"error": "invalid artifact id"}), 404
+    if artifact_id in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        text = ARTIFACTS.get(artifact_id)
+        if text is None:
+            return jsonify({"error": "unknown artifact"}), 404
+        resp = Response(text, mimetype="text/plain")
+        name = request.args.get("name", "")
+        if not re.fullmatch(r"[\w.-]{1,64}", name):
+            name = artifact_id[:12] + ".pddl"
+        resp.headers["Content-Disposition"] = f'attachment; filename="{name}"'
+    resp.set_etag(artifact_id)
+    resp.headers["Cache-Control"] = f"public, max-age={ARTIFACT_MAX_AGE_HEADER}, immutable"
+    return resp
 
 if __name__ == "__main__":
     app.run(debug=True)
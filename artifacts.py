@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# -------------------------
+# Almacenamiento direccionado por contenido
+# -------------------------
+# Cada texto se guarda una sola vez bajo el sha256 de su contenido:
+#   <root>/<id[:2]>/<id>.pddl
+# La escritura es atómica (fichero temporal + os.replace), así que lectores
+# concurrentes nunca ven un fichero a medias y dos escritores del mismo
+# contenido no se pisan.
+
+SUFFIX = ".pddl"
+
+
+def blob_id(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def blob_path(root, artifact_id):
+    return os.path.join(root, artifact_id[:2], artifact_id + SUFFIX)
+
+
+def write_blob(root, text, artifact_id=None):
+    """
+    Guarda text si no existe ya. Salida: el id (sha256 hex).
+    """
+    artifact_id = artifact_id or blob_id(text)
+    path = blob_path(root, artifact_id)
+    if os.path.exists(path):
+        return artifact_id
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as fh:
+            fh.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return artifact_id
+
+
+# -------------------------
+# Almacén para el servidor: escritura asíncrona + recolección de basura
+# -------------------------
+WRITE_SECONDS = metrics.histogram("artifact_write_seconds", "Time to write one artifact to disk.")
+
+
+class ArtifactStore:
+    """
+    put() devuelve el id al instante y deja el texto en memoria; un hilo
+    escritor lo pasa a disco en segundo plano (la petición no paga la
+    escritura). get() sirve desde memoria mientras el fichero no existe.
+    gc() borra por antigüedad (max_age, segundos) y después los más viejos
+    hasta quedar por debajo de max_bytes; el escritor la lanza cada
+    gc_interval segundos.
+    """
+
+    RECENT_SIZE = 4096  # ids known to be on disk, skips re-queueing hot artifacts
+
+    def __init__(self, root, max_bytes=None, max_age=None, gc_interval=300):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.gc_interval = gc_interval
+        self._pending = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._last_gc = time.time()
+        self.writes = 0
+        self.dedupes = 0
+        self.collected = 0
+
+    def put(self, text):
+        artifact_id = blob_id(text)
+        with self._lock:
+            if artifact_id in self._pending or artifact_id in self._recent:
+                self.dedupes += 1
+                return artifact_id
+            self._pending[artifact_id] = text
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+                self._writer.start()
+        self._queue.put(artifact_id)
+        return artifact_id
+
+    def get(self, artifact_id):
+        with self._lock:
+            text = self._pending.get(artifact_id)
+        if text is not None:
+            return text
+        try:
+            with open(blob_path(self.root, artifact_id), encoding="utf-8", newline="") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    def flush(self):
+        """
+        Espera a que todas las escrituras pendientes lleguen a disco.
+        """
+        self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            artifact_id = self._queue.get()
+            try:
+                with self._lock:
+                    text = self._pending.get(artifact_id)
+                if text is not None:
+                    if not os.path.exists(blob_path(self.root, artifact_id)):
+                        with WRITE_SECONDS.time():
+                            write_blob(self.root, text, artifact_id)
+                        self.writes += 1
+                    else:
+                        self.dedupes += 1
+                    with self._lock:
+                        del self._pending[artifact_id]
+                        self._recent[artifact_id] = True
+                        if len(self._recent) > self.RECENT_SIZE:
+                            self._recent.popitem(last=False)
+                if self.gc_interval and time.time() - self._last_gc > self.gc_interval:
+                    self.gc()
+            except Exception:
+                logging.exception("Artifact write failed: %s", artifact_id)
+            finally:
+                self._queue.task_done()
+
+    def gc(self):
+        """
+        Aplica la política de tamaño/antigüedad. Salida: ficheros borrados.
+        """
+        self._last_gc = time.time()
+        if self.max_bytes is None and self.max_age is None:
+            return 0
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith(SUFFIX):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path, name[:-len(SUFFIX)]))
+        files.sort()
+        total = sum(f[1] for f in files)
+        cutoff = time.time() - self.max_age if self.max_age else None
+        removed = 0
+        for mtime, size, path, artifact_id in files:
+            too_old = cutoff is not None and mtime < cutoff
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (too_old or too_big):
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            with self._lock:
+                self._recent.pop(artifact_id, None)
+        self.collected += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "writes": self.writes, "dedupes": self.dedupes, "collected": self.collected}
@@ -0,0 +1,150 @@
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from pddl_generator import current_lexicon, ensure_lexicon, generate_pddl_from_instruction
+
+# -------------------------
+# Generación por lotes (pool de procesos, orden de entrada, ventana acotada)
+# -------------------------
+# Sin dependencias de Flask: lo usan tanto /generate/batch como la CLI.
+
+DEFAULT_CHUNK_SIZE = 32  # instructions per task, amortizes the IPC round trip
+WINDOW_PER_WORKER = 4  # chunks in flight per worker process
+POOL_BROKEN_ERROR = "a worker process died; the rest of the batch was not generated"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers=None):
+    """
+    Pool de procesos compartido, creado al primer uso (todos los núcleos).
+    Los workers salen de un forkserver y no de un fork del proceso que los
+    pide: ese proceso tiene hilos, y un fork copia cogido cualquier lock que
+    otro hilo tenga en ese momento (métricas, memo de dominios...).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context("forkserver"))
+        return _pool
+
+
+def discard_pool(executor):
+    """
+    Cierra un pool roto (un worker murió: OOM, kill) o que ya no se usa
+    (fin de cli.convert). Si es el compartido, el siguiente get_pool crea otro.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is executor:
+            _pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_instruction(item):
+    """
+    Acepta una cadena o un objeto con "instruction" (o "text").
+    """
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        value = item.get("instruction", item.get("text"))
+        if isinstance(value, str):
+            return value
+    raise ValueError("expected a string or an object with 'instruction'")
+
+
+def iter_ndjson(lines):
+    """
+    Una instrucción JSON por línea; las líneas vacías se ignoran. Los errores
+    de una línea se devuelven como excepción en su posición, sin cortar el lote.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            yield parse_instruction(json.loads(line))
+        except ValueError as e:
+            yield e
+
+
+def generate_chunk(instructions, lexicon=None):
+    """
+    Se ejecuta en el proceso worker; nunca lanza, cada fallo va en su fila.
+    lexicon: (versión, path del snapshot) con que generar; el worker lo
+    carga si tiene otro activo.
+    """
+    if lexicon is not None:
+        ensure_lexicon(*lexicon)
+    out = []
+    for instr in instructions:
+        if isinstance(instr, Exception):
+            out.append({"error": str(instr)})
+            continue
+        try:
+            out.append(generate_pddl_from_instruction(instr))
+        except Exception as e:
+            out.append({"error": str(e)})
+    return out
+
+
+def imap_ordered(executor, fn, items, window):
+    """
+    Como executor.map pero perezoso: como mucho `window` tareas en vuelo,
+    resultados en orden de entrada a medida que terminan.
+    """
+    pending = deque()
+    items = iter(items)
+    for item in itertools.islice(items, window):
+        pending.append(executor.submit(fn, item))
+    while pending:
+        result = pending.popleft().result()
+        for item in itertools.islice(items, 1):
+            pending.append(executor.submit(fn, item))
+        yield result
+
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def generate_many(instructions, executor=None, chunk_size=DEFAULT_CHUNK_SIZE, window=None):
+    """
+    Genera PDDL para un iterable (posiblemente infinito) de instrucciones.
+    Salida: iterador de (index, result) en orden de entrada; result es el
+    dict de generate_pddl_from_instruction o {"error": ...}. La memoria queda
+    acotada por window * chunk_size instrucciones. Si muere un worker, el
+    lote termina con una fila {"error", "aborted": True} en el primer índice
+    sin generar.
+    """
+    executor = executor or get_pool()
+    if window is None:
+        window = WINDOW_PER_WORKER * getattr(executor, "_max_workers", os.cpu_count() or 1)
+    # the whole batch uses the lexicon active when it started, even across a reload
+    lex = current_lexicon()
+    task = partial(generate_chunk, lexicon=(lex.version, lex.path))
+    index = 0
+    try:
+        for results in imap_ordered(executor, task, _chunks(instructions, chunk_size), window):
+            for result in results:
+                yield index, result
+                index += 1
+    except BrokenProcessPool:
+        discard_pool(executor)
+        yield index, {"error": POOL_BROKEN_ERROR, "aborted": True}
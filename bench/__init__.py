@@ -0,0 +1,6 @@
+"""
+Benchmarks reproducibles del generador y del pipeline de resolución.
+
+    python -m bench --out bench-results.json
+    python -m bench --compare bench-results.json   # falla si algo empeora
+"""
@@ -0,0 +1,85 @@
+import random
+
+from pddl_generator import current_lexicon
+
+# -------------------------
+# Corpus de los cuatro niveles del README
+# -------------------------
+LEVELS = {
+    "basico": [
+        "El robot debe recoger una manzana de la mesa.",
+        "El agente debe ir al cuarto y encender la luz.",
+        "El robot debe llevar un libro desde la mesa hasta la estantería.",
+        "El agente debe abrir la puerta del dormitorio.",
+        "El robot debe tomar una llave y usarla para abrir un cofre.",
+    ],
+    "intermedio": [
+        "El robot debe preparar té, pero solo después de hervir el agua en la tetera.",
+        "El agente debe cargar una batería antes de activar el dron.",
+        "El robot debe construir un juguete, pero necesita todas las piezas primero.",
+        "El agente debe arreglar la máquina, pero debe tener un destornillador.",
+        "El robot debe entregar un paquete, pero primero tiene que encontrarlo.",
+    ],
+    "avanzado": [
+        "El robot debe cocinar pasta: llenar la olla, hervir el agua y luego añadir la pasta.",
+        "El agente debe rescatar a un gato: localizarlo, acercarse, levantarlo y volver con él al punto inicial.",
+        "El robot debe limpiar una habitación: recoger basura, barrer el piso y vaciar el cubo.",
+        "El agente debe reparar un generador: quitar la tapa, reemplazar la pieza dañada y cerrar la tapa.",
+        "El robot debe montar una tienda de campaña: armar las estacas, colocar la tela y tensar las cuerdas.",
+    ],
+    "narrativo": [
+        "El androide debe recuperar un chip de memoria perdido y cargarlo en su núcleo.",
+        "El agente debe infiltrarse en el laboratorio y robar un archivo codificado.",
+        "El robot debe sellar una fuga de plasma antes de que el reactor se inestabilice.",
+        "El androide debe encontrar una flor marchita y revivirla con un líquido nutritivo.",
+        "El agente debe salvar a un niño: localizarlo, liberarlo y llevarlo a un lugar seguro.",
+    ],
+}
+
+# -------------------------
+# Generador sintético
+# -------------------------
+# Verbs are split by language by hand: the lexicon mixes both.
+LEXICON = current_lexicon()
+EN_VERBS = sorted(v for v in LEXICON.actions if v in (
+    "go", "walk", "move", "carry", "take", "bring", "fetch", "pick", "place", "put", "open", "close",
+    "use", "prepare", "make", "cook", "boil", "turn on", "turn off", "charge", "clean", "deliver",
+    "find", "assemble"))
+ES_VERBS = sorted(v for v in LEXICON.actions if v not in EN_VERBS and v != "kill")
+ENTITIES = sorted(set(e.replace("_", " ") for e in LEXICON.objects + LEXICON.places))
+PLACES = sorted(set(p.replace("_", " ") for p in LEXICON.places))
+
+
+def synthetic(steps, entities, en_ratio=0.5, seed=0):
+    """
+    Una instrucción de `steps` pasos que usa `entities` entidades distintas
+    del vocabulario; cada paso es ES o EN con probabilidad en_ratio.
+    Misma semilla, misma instrucción.
+    """
+    rng = random.Random(seed)
+    pool = rng.sample(ENTITIES, min(entities, len(ENTITIES)))
+    parts = []
+    for i in range(steps):
+        obj = pool[i % len(pool)]
+        place = rng.choice(PLACES)
+        if rng.random() < en_ratio:
+            parts.append(("then" if i else "", f"{rng.choice(EN_VERBS)} the {obj} in the {place}"))
+        else:
+            parts.append(("y luego" if i else "", f"{rng.choice(ES_VERBS)} la {obj} de la {place}"))
+    return " ".join(f"{sep} {text}".strip() for sep, text in parts)
+
+
+def synthetic_corpus(count, steps, entities, en_ratio=0.5, seed=0):
+    return [synthetic(steps, entities, en_ratio, seed * 100003 + i) for i in range(count)]
+
+
+def corpora(seed=0):
+    """
+    Todos los corpus del benchmark por nombre.
+    """
+    out = {f"readme_{name}": texts for name, texts in LEVELS.items()}
+    out["readme_all"] = [t for texts in LEVELS.values() for t in texts]
+    out["synthetic_5x5"] = synthetic_corpus(50, 5, 5, seed=seed)
+    out["synthetic_50x20"] = synthetic_corpus(20, 50, 20, seed=seed)
+    out["synthetic_1000x40"] = synthetic_corpus(3, 1000, 40, seed=seed)
+    return out
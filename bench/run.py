@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+
+from bench.corpus import corpora
+from pddl_generator import build_plan_steps, build_problem_from_steps, generate_pddl_from_instruction, get_domain, tokenize
+
+# -------------------------
+# Medición
+# -------------------------
+def summarize(samples):
+    """
+    samples: segundos por operación. Salida: n, total, throughput (op/s) y
+    percentiles en milisegundos (rango más cercano).
+    """
+    ordered = sorted(samples)
+    n = len(ordered)
+    total = sum(ordered)
+
+    def pct(p):
+        return ordered[min(n - 1, max(0, int(round(p / 100 * n + 0.5)) - 1))] * 1000
+
+    return {
+        "n": n,
+        "total_s": round(total, 6),
+        "throughput": round(n / total, 2) if total else None,
+        "mean_ms": round(total / n * 1000, 4),
+        "p50_ms": round(pct(50), 4),
+        "p99_ms": round(pct(99), 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def measure(fn, items, repeat, warmup=1):
+    for item in items[:warmup]:
+        fn(item)
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            t = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - t)
+    return summarize(samples)
+
+
+# -------------------------
+# Suites
+# -------------------------
+def bench_generate(results, corpus, repeat, only):
+    for name, texts in corpus.items():
+        key = f"generate/{name}"
+        if only in key:
+            results[key] = measure(generate_pddl_from_instruction, texts, repeat)
+
+
+def bench_stages(results, corpus, repeat, only):
+    for name, texts in corpus.items():
+        tokenized = [tokenize(t) for t in texts]
+        steps = [build_plan_steps(text, tokens) for text, tokens in tokenized]
+        stages = {
+            "normalize": (tokenize, texts),
+            "build_steps": (lambda tt: build_plan_steps(*tt), tokenized),
+            "build_domain": (lambda s: get_domain([x.action for x in s]), steps),
+            "build_problem": (build_problem_from_steps, steps),
+        }
+        for stage, (fn, items) in stages.items():
+            key = f"stage/{stage}/{name}"
+            if only in key:
+                results[key] = measure(fn, items, repeat)
+
+
+def bench_http(results, corpus, repeat, only, solve_items=15, stand_in=False):
+    """
+    /generate y /solve con el cliente de pruebas de Flask; cachés y
+    artefactos en un directorio temporal que se borra al terminar,
+    resolución con el planificador local (el mismo que en producción, sin
+    red). Con stand_in, /solve pasa por el backend http contra
+    solver_server.py en un hilo (claves http/solve_remote/...). Un 429 de
+    la cola de trabajos se reintenta tras Retry-After y se cuenta en
+    "rejected".
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        os.environ["FLASK_PLAN_CACHE_FILE"] = os.path.join(tmp, "plans.sqlite3")
+        os.environ["FLASK_ARTIFACT_DIR"] = os.path.join(tmp, "artifacts")
+        server = None
+        solve_suite = "solve"
+        if stand_in:
+            import solver_server
+
+            server = solver_server.make_server(port=0)
+            threading.Thread(target=server.serve_forever, name="solver-stand-in", daemon=True).start()
+            os.environ["FLASK_SOLVER_BACKEND"] = "http"
+            os.environ["FLASK_SOLVER_URL"] = f"http://127.0.0.1:{server.server_address[1]}/solve"
+            solve_suite = "solve_remote"
+        try:
+            _bench_http(results, corpus, repeat, only, solve_items, solve_suite)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+
+def _bench_http(results, corpus, repeat, only, solve_items, solve_suite):
+    import app as webapp  # configured from the environment at import time
+
+    client = webapp.app.test_client()
+    rejected = [0]
+
+    def generate_cold(text):
+        webapp.GENERATE_CACHE.clear()
+        client.post("/generate", json={"instruction": text})
+
+    def generate_warm(text):
+        client.post("/generate", json={"instruction": text})
+
+    def solve(pair):
+        webapp.PLAN_CACHE.clear()
+        resp = client.post("/solve", json={"domain": pair[0], "problem": pair[1]})
+        while resp.status_code == 429:
+            # job queue full: wait as told and submit again
+            rejected[0] += 1
+            time.sleep(float(resp.headers.get("Retry-After", 1)))
+            resp = client.post("/solve", json={"domain": pair[0], "problem": pair[1]})
+        job = resp.get_json()
+        if resp.status_code >= 400:
+            raise RuntimeError(f"/solve answered {resp.status_code}: {job}")
+        while job["status"] in ("queued", "running"):
+            time.sleep(0.001)
+            job = client.get(f"/solve/{job['job_id']}").get_json()
+
+    for name, texts in corpus.items():
+        for suite, fn in (("generate", generate_cold), ("generate_cached", generate_warm)):
+            key = f"http/{suite}/{name}"
+            if only in key:
+                results[key] = measure(fn, texts, repeat)
+    solvable = ("readme_all", "synthetic_5x5")
+    for name in solvable:
+        key = f"http/{solve_suite}/{name}"
+        if only in key and name in corpus:
+            outs = [generate_pddl_from_instruction(t) for t in corpus[name][:solve_items]]
+            rejected[0] = 0
+            results[key] = measure(solve, [(o["domain"], o["problem"]) for o in outs], repeat)
+            results[key]["rejected"] = rejected[0]
+    webapp.ARTIFACTS.flush()
+
+
+# -------------------------
+# Resultados
+# -------------------------
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "solver": "http-stand-in" if args.solver_stand_in else "local",
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Imprime la variación de p50 por benchmark. Salida: claves que empeoran
+    más de threshold (0.2 = 20 %).
+    """
+    regressions = []
+    for key in sorted(set(baseline["results"]) & set(current["results"])):
+        old = baseline["results"][key]["p50_ms"]
+        new = current["results"][key]["p50_ms"]
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:55s} {old:10.3f} -> {new:10.3f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark del generador NL -> PDDL y de /solve.")
+    parser.add_argument("--out", "-o", help="fichero JSON de resultados")
+    parser.add_argument("--compare", help="resultados previos contra los que comparar (p50)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento tolerado con --compare")
+    parser.add_argument("--repeat", type=int, default=5, help="pasadas sobre cada corpus")
+    parser.add_argument("--seed", type=int, default=0, help="semilla del corpus sintético")
+    parser.add_argument("--only", default="", help="solo benchmarks cuyo nombre contenga esta cadena")
+    parser.add_argument("--no-http", action="store_true", help="omitir /generate y /solve")
+    parser.add_argument("--solver-stand-in", action="store_true",
+                        help="/solve a través del backend http y solver_server.py (local, sin red)")
+    args = parser.parse_args(argv)
+
+    corpus = corpora(args.seed)
+    results = {}
+    bench_generate(results, corpus, args.repeat, args.only)
+    bench_stages(results, corpus, args.repeat, args.only)
+    if not args.no_http:
+        bench_http(results, corpus, args.repeat, args.only, stand_in=args.solver_stand_in)
+    report = {"meta": environment(args), "results": results}
+
+    for key, r in results.items():
+        rejected = f"  {r['rejected']} rejected (429)" if r.get("rejected") else ""
+        print(f"{key:55s} {r['throughput']:>10} op/s  p50 {r['p50_ms']:9.3f} ms  p99 {r['p99_ms']:9.3f} ms{rejected}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if compare(baseline, report, args.threshold):
+            return 1
+    return 0
@@ -0,0 +1,121 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------
+# Cache LRU + TTL en memoria (con persistencia opcional a disco)
+# -------------------------
+
+
+class LRUCache:
+    """
+    Cache thread-safe acotada por bytes (tamaño pickled aproximado de cada
+    valor) y por antigüedad (ttl, en segundos; None = sin caducidad).
+    Si se da path, se carga al crear y save() la vuelca de forma atómica.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=None, path=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, size, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # -------------------------
+    # Persistencia
+    # -------------------------
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = list(self._data.items())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".cache-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(snapshot, fh, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as fh:
+                snapshot = pickle.load(fh)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, (expires_at, size, value) in snapshot:
+                if expires_at is not None and expires_at < now:
+                    continue
+                self._data[key] = (expires_at, size, value)
+                self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
@@ -0,0 +1,240 @@
+"""
+Conversión masiva NL -> PDDL sin servidor (no importa Flask ni requests).
+
+    python cli.py instrucciones.jsonl --out salida/ [--field body] [--workers 8] [--pack]
+
+Cada línea del fichero de entrada es una cadena JSON o un objeto con la
+instrucción en --field (por defecto "instruction"). En --out se escriben:
+
+    index.jsonl     una fila por línea de entrada: {"line", "domain", "problem", "actions"}
+                    (ids sha256) o {"line", "error"}
+    objects/        ficheros PDDL direccionados por contenido (ver artifacts.py)
+    objects.ndjson  con --pack, en lugar de objects/: {"id", "text"} por línea
+    checkpoint.json posición en la entrada; si la ejecución se interrumpe,
+                    relanzar el mismo comando continúa donde se quedó
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+
+from artifacts import blob_id, write_blob
+from batch import DEFAULT_CHUNK_SIZE, discard_pool, generate_many, get_pool, parse_instruction
+
+CHECKPOINT_FILE = "checkpoint.json"
+INDEX_FILE = "index.jsonl"
+OBJECTS_DIR = "objects"
+PACK_FILE = "objects.ndjson"
+
+
+# -------------------------
+# Lectura de la entrada
+# -------------------------
+def _instruction(raw, field):
+    try:
+        item = json.loads(raw)
+        if isinstance(item, dict) and field in item:
+            item = item[field]
+        return parse_instruction(item)
+    except ValueError as e:
+        return e
+
+
+def read_instructions(fh, field, pending, position):
+    """
+    Lee fh (binario) desde su posición actual. Por cada línea no vacía
+    produce la instrucción (o la excepción de parseo) y encola en pending su
+    (número de línea, offset final). position sigue la última línea leída.
+    """
+    line_no = position["line"]
+    offset = position["offset"]
+    for raw in iter(fh.readline, b""):
+        line_no += 1
+        offset += len(raw)
+        position["line"] = line_no
+        position["offset"] = offset
+        if not raw.strip():
+            continue
+        pending.append((line_no, offset))
+        yield _instruction(raw.decode("utf-8"), field)
+
+
+# -------------------------
+# Checkpoint
+# -------------------------
+def load_checkpoint(out_dir, input_path):
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            state = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if state.get("input") != os.path.abspath(input_path):
+        raise SystemExit(f"{path} belongs to another input ({state.get('input')}); use --restart")
+    return state
+
+
+def save_checkpoint(out_dir, state):
+    fd, tmp = tempfile.mkstemp(dir=out_dir, prefix=".checkpoint-")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, os.path.join(out_dir, CHECKPOINT_FILE))
+
+
+def _truncate(path, size):
+    # drop rows written after the last checkpoint
+    with open(path, "ab") as fh:
+        fh.truncate(size)
+
+
+# -------------------------
+# Salida
+# -------------------------
+class LooseStore:
+    def __init__(self, out_dir):
+        self.root = os.path.join(out_dir, OBJECTS_DIR)
+        self.known = {}  # text -> id for the few distinct domains, skips the exists() syscall
+
+    def put(self, text, repeated=False):
+        if repeated:
+            artifact_id = self.known.get(text)
+            if artifact_id is None:
+                artifact_id = self.known[text] = write_blob(self.root, text)
+            return artifact_id
+        return write_blob(self.root, text)
+
+    def flush(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class PackStore:
+    """
+    Un único fichero append-only; cada objeto se escribe una vez.
+    """
+
+    def __init__(self, out_dir, size=None):
+        path = os.path.join(out_dir, PACK_FILE)
+        if size is not None and os.path.exists(path):
+            _truncate(path, size)
+        self.seen = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    self.seen.add(line[7:71])  # {"id":"<64 hex>",...
+        self.fh = open(path, "a", encoding="utf-8")
+
+    def put(self, text, repeated=False):
+        artifact_id = blob_id(text)
+        if artifact_id not in self.seen:
+            self.seen.add(artifact_id)
+            self.fh.write('{"id":"%s","text":%s}\n' % (artifact_id, json.dumps(text, ensure_ascii=False)))
+        return artifact_id
+
+    def flush(self):
+        self.fh.flush()
+        os.fsync(self.fh.fileno())
+        return self.fh.tell()
+
+    def close(self):
+        self.fh.close()
+
+
+# -------------------------
+# Main
+# -------------------------
+def convert(args):
+    os.makedirs(args.out, exist_ok=True)
+    index_path = os.path.join(args.out, INDEX_FILE)
+    state = None if args.restart else load_checkpoint(args.out, args.input)
+    if state is None:
+        state = {"input": os.path.abspath(args.input), "offset": 0, "line": 0, "rows": 0,
+                 "index_size": 0, "pack_size": 0, "done": False}
+        for name in (INDEX_FILE, PACK_FILE, CHECKPOINT_FILE):
+            if os.path.exists(os.path.join(args.out, name)):
+                os.unlink(os.path.join(args.out, name))
+    if state["done"]:
+        print(f"{args.input}: already converted ({state['rows']} rows)", file=sys.stderr)
+        return 0
+
+    if os.path.exists(index_path):
+        _truncate(index_path, state["index_size"])
+    store = PackStore(args.out, state["pack_size"]) if args.pack else LooseStore(args.out)
+    index = open(index_path, "a", encoding="utf-8")
+
+    def checkpoint(line, offset, done=False):
+        index.flush()
+        os.fsync(index.fileno())
+        pack_size = store.flush()
+        state.update(line=line, offset=offset, index_size=index.tell(), done=done)
+        if pack_size is not None:
+            state["pack_size"] = pack_size
+        save_checkpoint(args.out, state)
+
+    pending = deque()
+    position = {"line": state["line"], "offset": state["offset"]}
+    started = time.time()
+    rows = 0
+    line_no, offset = state["line"], state["offset"]
+    executor = get_pool(args.workers)
+    with open(args.input, "rb") as fh:
+        fh.seek(state["offset"])
+        instructions = read_instructions(fh, args.field, pending, position)
+        try:
+            for _, result in generate_many(instructions, executor, chunk_size=args.chunk_size):
+                if result.get("aborted"):
+                    checkpoint(line_no, offset)
+                    print(f"{result['error']} (line {pending[0][0]}); run again to resume", file=sys.stderr)
+                    return 1
+                line_no, offset = pending.popleft()
+                if "error" in result:
+                    row = {"line": line_no, "error": result["error"]}
+                else:
+                    row = {
+                        "line": line_no,
+                        "domain": store.put(result["domain"], repeated=True),
+                        "problem": store.put(result["problem"]),
+                        "actions": result["meta"]["actions_present"],
+                    }
+                index.write(json.dumps(row, ensure_ascii=False) + "\n")
+                rows += 1
+                state["rows"] += 1
+                if rows % args.checkpoint_every == 0:
+                    checkpoint(line_no, offset)
+                    rate = rows / max(time.time() - started, 1e-9)
+                    print(f"{state['rows']} rows ({rate:.0f}/s)", file=sys.stderr)
+        except KeyboardInterrupt:
+            checkpoint(line_no, offset)
+            print(f"interrupted at line {line_no}; run again to resume", file=sys.stderr)
+            return 130
+        finally:
+            # also clears the shared slot, so a later convert() in this process gets a new pool
+            discard_pool(executor)
+        # the reader is exhausted here, so this also covers trailing blank lines
+        checkpoint(position["line"], position["offset"], done=True)
+    index.close()
+    store.close()
+    print(f"{state['rows']} rows in {time.time() - started:.1f}s -> {args.out}", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conversión masiva de instrucciones (JSONL) a PDDL.")
+    parser.add_argument("input", help="fichero JSONL de entrada")
+    parser.add_argument("--out", "-o", required=True, help="directorio de salida")
+    parser.add_argument("--field", default="instruction", help="campo con la instrucción si cada línea es un objeto")
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto, todos los núcleos)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="instrucciones por tarea")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="filas entre checkpoints")
+    parser.add_argument("--pack", action="store_true", help="un único objects.ndjson en lugar de ficheros sueltos")
+    parser.add_argument("--restart", action="store_true", help="ignorar el checkpoint y empezar de cero")
+    return convert(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+import itertools
+import sys
+import time
+
+# -------------------------
+# Grounding a representación de bits
+# -------------------------
+# Cada átomo ground recibe un índice entero; un estado es un int usado como
+# bitset y cada acción ground lleva sus máscaras pre/add/del precalculadas:
+#   aplicable:  state & pre == pre
+#   sucesor:    (state & ~del) | add
+# Solo se indexan los átomos alcanzables desde init (más las metas), no el
+# producto completo de :predicates, para que la memoria crezca con lo que la
+# búsqueda puede tocar y no con objetos^aridad.
+# ground() y simplify.prune respetan los mismos presupuestos que la búsqueda
+# (deadline, cancel, max_bytes): si se agotan lanzan BudgetExceeded.
+
+ACTION_BYTES = 200  # approx. bytes per ground action before encoding (tuple, name, seen entry)
+ATOM_BYTES = 100  # approx. bytes per ground atom tuple
+CHECK_EVERY = 1024  # bindings (or actions) between budget checks
+
+
+class BudgetExceeded(Exception):
+    """
+    Presupuesto agotado antes de buscar; reason como stats["stopped"] de
+    la búsqueda ("timeout", "cancelled", "memory").
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def check_budget(deadline=None, cancel=None, max_bytes=None, used=0):
+    """
+    deadline en time.perf_counter(); used: bytes estimados hasta ahora.
+    """
+    if deadline is not None and time.perf_counter() > deadline:
+        raise BudgetExceeded("timeout")
+    if cancel is not None and cancel.is_set():
+        raise BudgetExceeded("cancelled")
+    if max_bytes is not None and used > max_bytes:
+        raise BudgetExceeded("memory")
+
+
+def _type_closure(types, typ):
+    out = [typ]
+    while typ in types and types[typ] not in out:
+        typ = types[typ]
+        out.append(typ)
+    if "object" not in out:
+        out.append("object")
+    return out
+
+
+def objects_by_type(domain, problem):
+    by_type = {}
+    for obj, types in problem["objects"].items():
+        for typ in types:
+            for t in _type_closure(domain["types"], typ):
+                bucket = by_type.setdefault(t, [])
+                if obj not in bucket:
+                    bucket.append(obj)
+    return by_type
+
+
+def _substitute(atoms, binding):
+    return [(a[0],) + tuple(binding.get(x, x) for x in a[1:]) for a in atoms]
+
+
+class _FactIndex:
+    """
+    Hechos alcanzados indexados por predicado y por (predicado, posición,
+    valor), para que el join de precondiciones no recorra todos los hechos.
+    """
+
+    def __init__(self, facts):
+        self.by_pred = {}
+        self.by_arg = {}
+        self.facts = set()
+        for fact in facts:
+            self.add(fact)
+
+    def add(self, fact):
+        if fact in self.facts:
+            return False
+        self.facts.add(fact)
+        self.by_pred.setdefault(fact[0], []).append(fact)
+        for pos, val in enumerate(fact[1:]):
+            self.by_arg.setdefault((fact[0], pos, val), []).append(fact)
+        return True
+
+    def candidates(self, atom, binding, params):
+        for pos, term in enumerate(atom[1:]):
+            if term not in params:
+                return self.by_arg.get((atom[0], pos, term), ())
+            if term in binding:
+                return self.by_arg.get((atom[0], pos, binding[term]), ())
+        return self.by_pred.get(atom[0], ())
+
+
+def interchangeable(domain, problem, by_type):
+    """
+    Objetos candidatos para los parámetros que ningún hecho liga: los que
+    nombran init o la meta y, de los demás, uno por combinación de tipos.
+    Dos objetos sin mencionar con los mismos tipos son intercambiables en
+    cualquier plan, así que basta instanciar uno. Salida: tipo -> lista.
+    """
+    mentioned = {arg for atom in problem["init"] for arg in atom[1:]}
+    mentioned.update(arg for atom in problem["goal"] for arg in atom[1:])
+    for schema in domain["actions"]:
+        params = {v for v, _ in schema["params"]}
+        for atom in schema["pre"] + schema["add"] + schema["del"]:
+            mentioned.update(x for x in atom[1:] if x not in params)
+    seen_types = set()
+    keep = set()
+    for obj, types in problem["objects"].items():
+        if obj in mentioned:
+            keep.add(obj)
+            continue
+        key = tuple(sorted(types))
+        if key not in seen_types:
+            seen_types.add(key)
+            keep.add(obj)
+    return {t: [o for o in objs if o in keep] for t, objs in by_type.items()}
+
+
+def _join(atoms, sources, allowed):
+    """
+    Sustituciones parciales que cumplen atoms, cada uno contra su índice de
+    hechos en sources (join sobre los hechos alcanzados). allowed:
+    parámetro -> objetos que puede tomar.
+    """
+    partial = [{}]
+    for atom, facts in zip(atoms, sources):
+        args = atom[1:]
+        nxt = []
+        for b in partial:
+            for fact in facts.candidates(atom, b, allowed):
+                if len(fact) - 1 != len(args):
+                    continue
+                nb = b
+                for term, val in zip(args, fact[1:]):
+                    if term in allowed:
+                        bound = nb.get(term)
+                        if bound is None:
+                            if val not in allowed[term]:
+                                break
+                            if nb is b:
+                                nb = dict(b)
+                            nb[term] = val
+                        elif bound != val:
+                            break
+                    elif term != val:
+                        break
+                else:
+                    nxt.append(nb)
+        partial = nxt
+        if not partial:
+            break
+    return partial
+
+
+def _bindings(schema, facts, delta, free, allowed):
+    """
+    Enumera las sustituciones de parámetros cuyas precondiciones se cumplen
+    en facts y usan al menos un hecho de delta (semi-naive: lo que solo usa
+    hechos anteriores ya se instanció en una ronda previa; delta=None en la
+    primera). Los parámetros que no aparecen en la precondición se
+    enumeran sobre free[parámetro] (ver interchangeable) y, si tampoco
+    aparecen en los efectos, con un único objeto: cualquiera vale igual.
+    """
+    pre = schema["pre"]
+    if delta is None:
+        partials = _join(pre, [facts] * len(pre), allowed)
+    elif not pre:
+        return
+    else:
+        partials = []
+        for i, atom in enumerate(pre):
+            if atom[0] not in delta.by_pred:
+                continue
+            # atom i against the new facts, the rest against all of them
+            order = [atom] + pre[:i] + pre[i + 1:]
+            partials.extend(_join(order, [delta] + [facts] * (len(pre) - 1), allowed))
+    if not partials:
+        return
+    variables = [v for v, _ in schema["params"]]
+    in_effects = {x for atom in schema["add"] + schema["del"] for x in atom[1:]}
+    for b in partials:
+        unbound = [v for v in variables if v not in b]
+        choices = [free[v] if v in in_effects else free[v][:1] for v in unbound]
+        for combo in itertools.product(*choices):
+            full = dict(b)
+            full.update(zip(unbound, combo))
+            yield tuple(full[v] for v in variables)
+
+
+def ground(domain, problem, limits=None, deadline=None, cancel=None, max_bytes=None):
+    """
+    Instancia solo las acciones alcanzables en la relajación sin deletes
+    (punto fijo semi-naive sobre los hechos alcanzados: cada ronda solo
+    liga contra los hechos nuevos de la anterior) y las codifica como
+    máscaras. limits: lista paralela a domain["actions"] de
+    simplify.relevant_parameters (None en una acción: no se instancia; un
+    parámetro acotado solo toma esos objetos). Cada CHECK_EVERY
+    sustituciones comprueba deadline, cancel y max_bytes (tamaño estimado
+    de lo instanciado) y lanza BudgetExceeded si alguno se agota.
+    Salida: dict {atoms, index, init, goal, actions, ...}
+    actions es una lista de tuplas (name, pre, add, del) con máscaras int.
+    """
+    by_type = objects_by_type(domain, problem)
+    type_sets = {t: set(objs) for t, objs in by_type.items()}
+    free_by_type = interchangeable(domain, problem, by_type)
+    schemas = []
+    for i, schema in enumerate(domain["actions"]):
+        limit = {} if limits is None else limits[i]
+        if limit is None:
+            continue
+        allowed = {}
+        free = {}
+        for v, t in schema["params"]:
+            if v in limit:
+                allowed[v] = type_sets.get(t, set()) & limit[v]
+                free[v] = [o for o in free_by_type.get(t, ()) if o in limit[v]]
+            else:
+                allowed[v] = type_sets.get(t, set())
+                free[v] = free_by_type.get(t, [])
+        schemas.append((schema, allowed, free))
+
+    facts = _FactIndex(problem["init"])
+
+    ground_actions = []
+    seen = set()
+    used = 0
+    steps = 0
+    delta = None
+    while delta is None or delta.facts:
+        new = {}  # dict, not set: keeps atom numbering (and so plans) deterministic
+        for schema, allowed, free in schemas:
+            variables = [v for v, _ in schema["params"]]
+            for args in _bindings(schema, facts, delta, free, allowed):
+                steps += 1
+                if steps % CHECK_EVERY == 0:
+                    check_budget(deadline, cancel, max_bytes, used)
+                key = (schema["name"], args)
+                if key in seen:
+                    continue
+                seen.add(key)
+                binding = dict(zip(variables, args))
+                pre = _substitute(schema["pre"], binding)
+                add = _substitute(schema["add"], binding)
+                delete = _substitute(schema["del"], binding)
+                ground_actions.append(("(" + " ".join(key[:1] + args) + ")", pre, add, delete))
+                used += ACTION_BYTES + ATOM_BYTES * (len(pre) + len(add) + len(delete))
+                for fact in add:
+                    if fact not in facts.facts:
+                        new[fact] = None
+        # new facts join the index only between rounds, so a round never sees its own output
+        for fact in new:
+            facts.add(fact)
+        delta = _FactIndex(new)
+
+    # atom table: init first, then goals, then whatever actions touch
+    atoms = []
+    index = {}
+
+    def idx(atom):
+        i = index.get(atom)
+        if i is None:
+            i = index[atom] = len(atoms)
+            atoms.append(atom)
+        return i
+
+    def mask(atom_list):
+        m = 0
+        for atom in atom_list:
+            m |= 1 << idx(atom)
+        return m
+
+    init = mask(problem["init"])
+    goal = mask(problem["goal"])
+    actions = []
+    for k, (name, pre, add, delete) in enumerate(ground_actions):
+        encoded = (name, mask(pre), mask(add), mask(delete))
+        actions.append(encoded)
+        # masks grow with the atom count: measure them instead of estimating
+        used += sum(sys.getsizeof(m) for m in encoded[1:])
+        if k % CHECK_EVERY == 0:
+            check_budget(deadline, cancel, max_bytes, used)
+    return build_tables({"atoms": atoms, "index": index, "init": init, "goal": goal, "actions": actions})
+
+
+# -------------------------
+# Tablas precalculadas para sucesores y heurística
+# -------------------------
+def bits(mask):
+    """
+    Índices de los bits activos de mask, de menor a mayor.
+    """
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
+
+
+def build_tables(task):
+    """
+    Completa task con:
+      always      acciones sin precondición
+      by_trigger  átomo -> acciones cuyo bit de precondición más bajo es ese
+                  (cada acción se revisa una sola vez por estado)
+      pre_index   átomo -> acciones que lo requieren (para h_add)
+      pre_count / add_ids  por acción, para la relajación
+    """
+    n = len(task["atoms"])
+    always = []
+    by_trigger = [[] for _ in range(n)]
+    pre_index = [[] for _ in range(n)]
+    pre_count = []
+    add_ids = []
+    for i, (_, pre, add, _) in enumerate(task["actions"]):
+        pre_bits = bits(pre)
+        pre_count.append(len(pre_bits))
+        add_ids.append(bits(add))
+        if pre_bits:
+            by_trigger[pre_bits[0]].append(i)
+        else:
+            always.append(i)
+        for b in pre_bits:
+            pre_index[b].append(i)
+    task.update({
+        "always": always,
+        "by_trigger": by_trigger,
+        "pre_index": pre_index,
+        "pre_count": pre_count,
+        "add_ids": add_ids,
+    })
+    return task
+
+
+def applicable(task, state):
+    """
+    Índices de las acciones aplicables en state.
+    """
+    actions = task["actions"]
+    out = list(task["always"])
+    by_trigger = task["by_trigger"]
+    s = state
+    while s:
+        low = s & -s
+        for i in by_trigger[low.bit_length() - 1]:
+            pre = actions[i][1]
+            if state & pre == pre:
+                out.append(i)
+        s ^= low
+    return out
+
+
+def decode(task, state):
+    """
+    Bitset -> lista de átomos (tuplas), útil para diagnósticos.
+    """
+    atoms = task["atoms"]
+    return [atoms[i] for i in bits(state)]
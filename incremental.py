@@ -0,0 +1,202 @@
+import difflib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import metrics
+from pddl_generator import build_plan_steps, build_problem_from_steps, get_domain, step_spans, tokenize
+from step_ir import Step
+
+# -------------------------
+# Regeneración incremental (vista previa mientras se escribe)
+# -------------------------
+# Entre dos versiones de una instrucción casi todos los pasos son iguales.
+# Cada paso se analiza por separado sobre su propio texto y el Step
+# resultante (offsets relativos al paso) se guarda por (versión del lexicón,
+# texto del paso); al regenerar solo se analizan los pasos nuevos y los demás
+# se recolocan en el texto nuevo. El dominio sale de get_domain (memoizado
+# por conjunto de acciones) y el cliente recibe solo el diff por líneas del
+# PDDL respecto a la revisión que ya tiene.
+
+STEP_CACHE_SIZE = 65536
+
+STEPS_TOTAL = metrics.counter("incremental_steps_total", "Steps seen by incremental regeneration.", ["result"])
+
+
+class StepCache:
+    def __init__(self, size=STEP_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+            return hit
+
+    def put(self, key, step):
+        with self._lock:
+            self._items[key] = step
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+_step_cache = StepCache()
+
+
+def _rebase(step, text, offset):
+    cond = step.cond_start
+    return Step(text, step.start + offset, step.end + offset, step.verb_start + offset, step.verb_end + offset,
+                step.action, step.object, step.place, None if cond is None else cond + offset)
+
+
+def parse_step_text(step_text, lex):
+    """
+    Step de un único paso (texto normalizado, sin separadores), con offsets
+    relativos a step_text.
+    """
+    return build_plan_steps(step_text, lex=lex)[0]
+
+
+def changes(a, b):
+    """
+    Bloques distintos entre las secuencias a y b: lista de (i1, i2, j1, j2),
+    a[i1:i2] -> b[j1:j2]. El prefijo y el sufijo comunes se recortan antes
+    de difflib, que es cuadrático con líneas repetidas; una edición al
+    escribir solo toca una zona pequeña.
+    """
+    n = min(len(a), len(b))
+    lo = 0
+    while lo < n and a[lo] == b[lo]:
+        lo += 1
+    hi = 0
+    while hi < n - lo and a[len(a) - 1 - hi] == b[len(b) - 1 - hi]:
+        hi += 1
+    a_mid, b_mid = a[lo:len(a) - hi], b[lo:len(b) - hi]
+    if not a_mid and not b_mid:
+        return []
+    if not a_mid or not b_mid:
+        return [(lo, len(a) - hi, lo, len(b) - hi)]
+    matcher = difflib.SequenceMatcher(None, a_mid, b_mid, autojunk=False)
+    return [(lo + i1, lo + i2, lo + j1, lo + j2)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def line_diff(old, new):
+    """
+    Operaciones [i1, i2, líneas] que convierten old en new: cada una
+    sustituye las líneas old[i1:i2]. Se aplican de la última a la primera
+    (ver apply_diff).
+    """
+    a, b = old.split("\n"), new.split("\n")
+    return [[i1, i2, b[j1:j2]] for i1, i2, j1, j2 in changes(a, b)]
+
+
+def apply_diff(old, ops):
+    lines = old.split("\n")
+    for i1, i2, new in reversed(ops):
+        lines[i1:i2] = new
+    return "\n".join(lines)
+
+
+# -------------------------
+# Sesiones
+# -------------------------
+class SessionStore:
+    """
+    Última revisión generada por sesión (textos de los pasos, Steps y PDDL),
+    acotada en número (LRU) y en inactividad (ttl, segundos).
+    """
+
+    def __init__(self, max_sessions=1024, ttl=1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id):
+        now = time.time()
+        with self._lock:
+            state = self._sessions.get(session_id) if session_id else None
+            if state is not None and now - state["used"] > self.ttl:
+                del self._sessions[session_id]
+                state = None
+            if state is None:
+                session_id = uuid.uuid4().hex
+                state = self._sessions[session_id] = {"id": session_id, "revision": 0, "lock": threading.Lock()}
+            self._sessions.move_to_end(session_id)
+            state["used"] = now
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return state
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def update(self, session_id, base, instruction, lex):
+        """
+        Regenera instruction en la sesión. Si base es la revisión que guarda
+        la sesión, la respuesta trae diffs contra ella; si no (sesión nueva,
+        caducada o respuestas desordenadas) trae los textos completos.
+        """
+        state = self._get(session_id)
+        with state["lock"]:
+            return _regenerate(state, base, instruction, lex)
+
+
+def _regenerate(state, base, instruction, lex):
+    raw = instruction or ""
+    text, tokens = tokenize(raw)
+    spans = step_spans(tokens, lex)
+    step_texts = [text[tokens[i][1]:tokens[j - 1][2]] for i, j in spans]
+
+    old_texts = state.get("step_texts", []) if state.get("lexicon") == lex.version else []
+    known = state.get("templates", {}) if old_texts else {}
+    changed = [j for _, _, j1, j2 in changes(old_texts, step_texts) for j in range(j1, j2)]
+
+    steps = []
+    templates = {}
+    parsed = 0
+    for (i, _), step_text in zip(spans, step_texts):
+        template = known.get(step_text)
+        if template is None:
+            key = (lex.version, step_text)
+            template = _step_cache.get(key)
+            if template is None:
+                template = parse_step_text(step_text, lex)
+                _step_cache.put(key, template)
+                parsed += 1
+        templates[step_text] = template
+        steps.append(_rebase(template, text, tokens[i][1]))
+    STEPS_TOTAL.inc(len(steps) - parsed, result="reused")
+    STEPS_TOTAL.inc(parsed, result="parsed")
+
+    actions_present = [s.action for s in steps]
+    domain, domain_etag = get_domain(actions_present)
+    problem = build_problem_from_steps(steps, lex=lex)
+
+    out = {"session": state["id"]}
+    if base is not None and base == state["revision"] and "problem" in state:
+        out["base"] = base
+        out["domain_diff"] = [] if domain == state["domain"] else line_diff(state["domain"], domain)
+        out["problem_diff"] = line_diff(state["problem"], problem)
+    else:
+        out["base"] = None
+        out["domain"] = domain
+        out["problem"] = problem
+    state.update(revision=state["revision"] + 1, lexicon=lex.version, step_texts=step_texts,
+                 templates=templates, domain=domain, problem=problem)
+    out["revision"] = state["revision"]
+    out["steps"] = {"total": len(steps), "changed": changed, "parsed": parsed, "reused": len(steps) - parsed}
+    out["meta"] = {
+        "raw": raw,
+        "normalized": text,
+        "steps": steps,
+        "actions_present": actions_present,
+        "domain_etag": domain_etag,
+        "lexicon_version": lex.version,
+    }
+    return out
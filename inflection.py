@@ -0,0 +1,86 @@
+# -------------------------
+# Índice de flexiones (ES / EN)
+# -------------------------
+# Genera, a partir de un lema (infinitivo), las formas conjugadas más comunes
+# que aparecen en instrucciones: presente, imperativo, gerundio, participio,
+# pasado (EN) e infinitivo/gerundio/imperativo con pronombre enclítico
+# ("usarla", "cargandolo", "dejala"). Las formas salen ya plegadas (minúsculas, sin tildes) para
+# casar con la salida de normalize().
+
+ES_ENDINGS = {
+    "ar": ["a", "as", "an", "o", "amos", "e", "en", "ando", "ado", "ada", "ados", "adas"],
+    "er": ["e", "es", "en", "o", "emos", "a", "an", "iendo", "ido", "ida", "idos", "idas"],
+    "ir": ["e", "es", "en", "o", "imos", "a", "an", "iendo", "ido", "ida", "idos", "idas"],
+}
+ES_CLITICS = ["lo", "la", "los", "las", "le", "les", "se", "me", "te", "nos"]
+
+# stem-changing lexicon verbs (present tense uses the changed stem)
+ES_STEM_CHANGES = {
+    "encontrar": "encuentr", "encender": "enciend", "cerrar": "cierr",
+    "hervir": "hierv", "calentar": "calient", "mover": "muev", "volver": "vuelv",
+}
+
+# irregular tú-imperatives; only their clitic forms are indexed ("ponla", "vete"): bare "ve" is also "sees"
+ES_IMPERATIVE_IRREGULAR = {
+    "hacer": "haz", "poner": "pon", "ir": "ve", "tener": "ten", "salir": "sal", "venir": "ven", "decir": "di",
+}
+
+EN_IRREGULAR = {
+    "go": ["goes", "going", "went", "gone"],
+    "take": ["took", "taken"],
+    "bring": ["brought"],
+    "make": ["made"],
+    "find": ["found"],
+    "put": ["puts", "putting"],
+    "fetch": ["fetches"],
+    "kill": ["kills"],
+}
+
+
+def spanish_forms(lemma):
+    ending = lemma[-2:]
+    stem = lemma[:-2]
+    if ending not in ES_ENDINGS or len(stem) < 2:
+        imperative = ES_IMPERATIVE_IRREGULAR.get(lemma)
+        if imperative is None and lemma.isalpha() and lemma[-1] in "aeion":
+            # the lexicon also lists imperatives as phrases ("toma", "pon")
+            imperative = lemma
+        return [imperative + clitic for clitic in ES_CLITICS] if imperative else []
+    forms = [stem + suffix for suffix in ES_ENDINGS[ending]]
+    changed = ES_STEM_CHANGES.get(lemma)
+    if changed:
+        forms.extend(changed + suffix for suffix in ("a", "as", "an", "o", "e", "es", "en"))
+    gerund = stem + ("ando" if ending == "ar" else "iendo")
+    imperative = ES_IMPERATIVE_IRREGULAR.get(lemma) or (changed or stem) + ("a" if ending == "ar" else "e")
+    for clitic in ES_CLITICS:
+        forms.append(lemma + clitic)
+        forms.append(gerund + clitic)
+        forms.append(imperative + clitic)
+    return forms
+
+
+def english_forms(lemma):
+    if not lemma.isalpha() or len(lemma) < 2:
+        return []
+    if lemma.endswith("e"):
+        forms = [lemma + "s", lemma[:-1] + "ing", lemma + "d"]
+    elif lemma.endswith("y") and lemma[-2] not in "aeiou":
+        forms = [lemma[:-1] + "ies", lemma + "ing", lemma[:-1] + "ied"]
+    elif lemma.endswith(("s", "sh", "ch", "x")):
+        forms = [lemma + "es", lemma + "ing", lemma + "ed"]
+    else:
+        forms = [lemma + "s", lemma + "ing", lemma + "ed"]
+    return forms + EN_IRREGULAR.get(lemma, [])
+
+
+def inflection_index(lemmas):
+    """
+    Mapa forma -> lema para todos los lemas dados. Un lema siempre se mapea a
+    sí mismo y gana sobre cualquier forma generada; entre formas generadas
+    gana el primer lema que la produce.
+    """
+    index = {lemma: lemma for lemma in lemmas}
+    for lemma in lemmas:
+        for form in spanish_forms(lemma) + english_forms(lemma):
+            index.setdefault(form, lemma)
+    return index
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------
+# Cola de trabajos de resolución (pool acotado + sondeo de estado)
+# -------------------------
+# Los trabajos corren en un ThreadPoolExecutor de tamaño fijo; como mucho
+# max_pending trabajos esperan o corren a la vez y el resto se rechaza con
+# QueueFull (el endpoint responde 429). Los presupuestos de tiempo/memoria y
+# la cancelación son cooperativos: la función recibe el Job y consulta
+# job.cancel_event, job.time_budget y job.memory_budget.
+#
+# El estado vive en memoria del proceso: con varios procesos worker hay que
+# enrutar el sondeo al mismo proceso (o usar un único proceso con hilos).
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__("solve queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, time_budget, memory_budget):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.progress = {}
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget
+        self.cancel_event = threading.Event()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    def to_dict(self):
+        out = {"job_id": self.id, "status": self.status, "progress": dict(self.progress)}
+        if self.result is not None:
+            out["result"] = self.result
+        if self.error is not None:
+            out["error"] = self.error
+        return out
+
+
+class JobQueue:
+    def __init__(self, workers=2, max_pending=16, time_budget=10.0, memory_budget=256 * 1024 * 1024, history=1024):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="solve")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget
+        self.history = history
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """
+        Encola fn(job, *args); su valor de retorno queda en job.result.
+        Lanza QueueFull si ya hay max_pending trabajos sin terminar.
+        """
+        job = Job(self.time_budget, self.memory_budget)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                # rough ETA: one budget per batch of workers ahead of us
+                raise QueueFull(retry_after=max(1, int(self.time_budget * self._pending / self.workers)))
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job, fn, args)
+        return job
+
+    def finished(self, result):
+        """
+        Registra un trabajo ya resuelto (p. ej. un acierto de caché) para que
+        el cliente lo consulte igual que cualquier otro.
+        """
+        job = Job(self.time_budget, self.memory_budget)
+        job.status = DONE
+        job.result = result
+        job.started = job.finished = job.created
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    def _run(self, job, fn, args):
+        try:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+                return
+            job.status = RUNNING
+            job.started = time.time()
+            job.result = fn(job, *args)
+            job.status = CANCELLED if job.cancel_event.is_set() else DONE
+        except Exception as e:
+            logging.exception("Solve job %s failed", job.id)
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._pending -= 1
+
+    def _prune(self):
+        # keep at most `history` jobs, dropping the oldest finished ones
+        if len(self._jobs) <= self.history:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history:
+                break
+            if self._jobs[job_id].status in FINISHED:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED:
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                # never started: the executor will not call _run
+                job.status = CANCELLED
+                job.finished = time.time()
+                with self._lock:
+                    self._pending -= 1
+        return job
+
+    def depth(self):
+        with self._lock:
+            return self._pending
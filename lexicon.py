@@ -0,0 +1,391 @@
+"""
+Lexicones en ficheros de datos, compilados a un snapshot binario.
+
+    python lexicon.py [--src lexicons/] [--out lexicons/compiled.snap]
+
+Fuentes (lexicons/):
+
+    actions.tsv     frase<TAB>tipo de acción
+    objects.txt     una entidad por línea
+    places.txt      un lugar por línea
+    connectors.tsv  separator|condition<TAB>frase
+
+El snapshot guarda los autómatas ya construidos (Aho–Corasick de objetos y
+lugares, trie de frases verbales con su índice de flexiones) como tablas de
+enteros; cargarlo no pliega entradas, no genera flexiones ni calcula
+enlaces de fallo. La versión es el sha256 de las fuentes: dos compilaciones
+de los mismos ficheros dan el mismo snapshot, byte a byte.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from inflection import inflection_index
+from matcher import EntityMatcher, PhraseRecognizer, load_lexicon
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(HERE, "lexicons")
+SNAPSHOT_PATH = os.path.join(SOURCE_DIR, "compiled.snap")
+SOURCES = ("actions.tsv", "objects.txt", "places.txt", "connectors.tsv")
+
+# -------------------------
+# Formato
+# -------------------------
+# header: magic, formato, nº de secciones, sha256 de las fuentes
+# tabla de secciones: (nombre de 4 bytes, offset, longitud)
+# secciones: tablas uint32 little-endian o bytes, alineadas a 8
+MAGIC = b"LEXSNAP\0"
+FORMAT = 3
+HEADER = struct.Struct("<8sII32s")
+SECTION = struct.Struct("<4sQQ")
+ALIGN = 8
+
+
+class LexiconError(ValueError):
+    pass
+
+
+# -------------------------
+# Lectura de las fuentes
+# -------------------------
+def _rows(path):
+    with open(path, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, 1):
+            line = line.rstrip("\n")
+            if line.strip() and not line.lstrip().startswith("#"):
+                yield line_no, line
+
+
+def _pairs(path):
+    for line_no, line in _rows(path):
+        parts = [p.strip() for p in line.split("\t")]
+        if len(parts) != 2 or not all(parts):
+            raise LexiconError(f"{path}:{line_no}: expected '<phrase>\\t<type>', got {line!r}")
+        yield parts
+
+
+def read_sources(src=SOURCE_DIR):
+    """
+    Salida: {actions: {frase: tipo}, objects, places, separators,
+    condition_prefix}, validado.
+    """
+    actions = dict(_pairs(os.path.join(src, "actions.tsv")))
+    with open(os.path.join(src, "objects.txt"), encoding="utf-8") as fh:
+        objects = load_lexicon(fh)
+    with open(os.path.join(src, "places.txt"), encoding="utf-8") as fh:
+        places = load_lexicon(fh)
+    separators = []
+    conditions = []
+    for kind, phrase in _pairs(os.path.join(src, "connectors.tsv")):
+        if kind == "separator":
+            separators.append(phrase)
+        elif kind == "condition":
+            conditions.append(tuple(phrase.split()))
+        else:
+            raise LexiconError(f"connectors.tsv: unknown connector kind {kind!r}")
+    if len(conditions) != 1:
+        raise LexiconError("connectors.tsv: expected exactly one 'condition' prefix")
+    return {"actions": actions, "objects": objects, "places": places,
+            "separators": separators, "condition_prefix": conditions[0]}
+
+
+def source_digest(src=SOURCE_DIR):
+    h = hashlib.sha256()
+    for name in SOURCES:
+        with open(os.path.join(src, name), "rb") as fh:
+            data = fh.read()
+        h.update(b"%s\0%d\0" % (name.encode(), len(data)))
+        h.update(data)
+    return h.digest()
+
+
+# -------------------------
+# Compilación
+# -------------------------
+class _Strings:
+    def __init__(self):
+        self.ids = {}
+
+    def __call__(self, text):
+        i = self.ids.get(text)
+        if i is None:
+            i = self.ids[text] = len(self.ids)
+        return i
+
+    def tables(self):
+        blob = bytearray()
+        offsets = array("I", [0])
+        for text in self.ids:
+            blob += text.encode("utf-8")
+            offsets.append(len(blob))
+        return bytes(blob), offsets
+
+
+def _entity_tables(prefix, matcher, sid):
+    first = array("I", [0])
+    chars = []
+    targets = array("I")
+    out_len = array("I")
+    out_name = array("I")
+    for node, edges in enumerate(matcher.goto):
+        chars.extend(edges)
+        targets.extend(edges.values())
+        first.append(len(targets))
+        hit = matcher.out[node]
+        out_len.append(hit[0] if hit else 0)
+        out_name.append(sid(hit[1]) if hit else 0)
+    return {
+        prefix + "edg": first, prefix + "chr": "".join(chars).encode("utf-32-le"), prefix + "tgt": targets,
+        prefix + "fai": array("I", matcher.fail), prefix + "dct": array("I", matcher.dict_link),
+        prefix + "oln": out_len, prefix + "onm": out_name,
+    }
+
+
+def _trie_tables(recognizer, sid):
+    # breadth-first node ids; kind is stored as string id + 1 (0 = no phrase ends here)
+    nodes = [recognizer.trie]
+    first = array("I", [0])
+    tokens = array("I")
+    targets = array("I")
+    kinds = array("I")
+    for node in nodes:
+        for tok, child in node.items():
+            if tok is None:
+                continue
+            tokens.append(sid(tok))
+            targets.append(len(nodes))
+            nodes.append(child)
+        first.append(len(tokens))
+        kinds.append(sid(node[None]) + 1 if None in node else 0)
+    forms = sorted(recognizer.forms.items())
+    return {
+        "Aedg": first, "Atok": tokens, "Atgt": targets, "Akin": kinds,
+        "Afrm": array("I", (sid(f) for f, _ in forms)), "Alem": array("I", (sid(l) for _, l in forms)),
+    }
+
+
+def compile_sources(src=SOURCE_DIR):
+    """
+    Compila las fuentes de src. Salida: el snapshot (bytes).
+    """
+    sources = read_sources(src)
+    digest = source_digest(src)
+    objects = EntityMatcher(sources["objects"])
+    places = EntityMatcher(sources["places"])
+    actions = PhraseRecognizer(sources["actions"], inflect=inflection_index)
+
+    sid = _Strings()
+    sections = {}
+    sections.update(_entity_tables("O", objects, sid))
+    sections.update(_entity_tables("P", places, sid))
+    sections.update(_trie_tables(actions, sid))
+    sections["Sphr"] = array("I", (sid(p) for p in sources["actions"]))
+    sections["Styp"] = array("I", (sid(k) for k in sources["actions"].values()))
+    sections["Sobj"] = array("I", (sid(w) for w in sources["objects"]))
+    sections["Spla"] = array("I", (sid(w) for w in sources["places"]))
+    sections["Csep"] = array("I", (sid(t) for t in sources["separators"]))
+    sections["Ccnd"] = array("I", (sid(t) for t in sources["condition_prefix"]))
+    sections["META"] = json.dumps({
+        "version": digest.hex()[:12],
+        "sizes": {"objects": objects.size, "places": places.size},
+        "counts": {"actions": len(sources["actions"]), "objects": len(sources["objects"]),
+                   "places": len(sources["places"]), "forms": len(actions.forms)},
+    }, sort_keys=True).encode("utf-8")
+    # strings last: every table above has interned its entries by now
+    sections["STRS"], sections["STRO"] = sid.tables()
+
+    header_size = HEADER.size + SECTION.size * len(sections)
+    table = []
+    body = bytearray()
+    offset = header_size
+    for name, data in sections.items():
+        if isinstance(data, array):
+            if sys.byteorder != "little":
+                data = array(data.typecode, data)
+                data.byteswap()
+            data = data.tobytes()
+        pad = -offset % ALIGN
+        body += b"\0" * pad
+        offset += pad
+        table.append(SECTION.pack(name.encode("ascii"), offset, len(data)))
+        body += data
+        offset += len(data)
+    return HEADER.pack(MAGIC, FORMAT, len(sections), digest) + b"".join(table) + bytes(body)
+
+
+def write_snapshot(data, path=SNAPSHOT_PATH):
+    """
+    Escritura atómica (temporal + os.replace): quien tenga abierto el
+    snapshot anterior lo sigue leyendo entero.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return path
+
+
+# -------------------------
+# Carga
+# -------------------------
+def _read_header(buf, path):
+    if len(buf) < HEADER.size:
+        raise LexiconError(f"{path}: not a lexicon snapshot")
+    magic, fmt, count, digest = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise LexiconError(f"{path}: not a lexicon snapshot")
+    if fmt != FORMAT:
+        raise LexiconError(f"{path}: snapshot format {fmt}, expected {FORMAT}; recompile it")
+    return count, digest
+
+
+def snapshot_digest(path):
+    """
+    sha256 de las fuentes del snapshot (solo lee la cabecera), o None.
+    """
+    try:
+        with open(path, "rb") as fh:
+            return _read_header(fh.read(HEADER.size), path)[1]
+    except (OSError, LexiconError):
+        return None
+
+
+class Lexicon:
+    """
+    Un snapshot cargado. Inmutable: para cambiar de lexicón se carga otro y
+    se cambia la referencia (ver pddl_generator.set_lexicon), así que una
+    petición en curso termina con el que empezó.
+    """
+
+    def __init__(self, buf, path=None):
+        count, digest = _read_header(buf, path)
+        sections = {}
+        for k in range(count):
+            name, offset, length = SECTION.unpack_from(buf, HEADER.size + k * SECTION.size)
+            sections[name.decode("ascii")] = (offset, length)
+        self._buf = buf
+        self._sections = sections
+        self.path = path
+        self.digest = digest.hex()
+        meta = json.loads(self._bytes("META"))
+        self.version = meta["version"]
+        self.counts = meta["counts"]
+
+        blob = self._bytes("STRS")
+        offsets = self._ints("STRO")
+        self.strings = strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        self.object_matcher = self._entity_matcher("O", meta["sizes"]["objects"])
+        self.place_matcher = self._entity_matcher("P", meta["sizes"]["places"])
+        self.action_recognizer = self._recognizer()
+        self.actions = dict(zip((strings[i] for i in self._ints("Sphr")), (strings[i] for i in self._ints("Styp"))))
+        self.objects = [strings[i] for i in self._ints("Sobj")]
+        self.places = [strings[i] for i in self._ints("Spla")]
+        self.separators = frozenset(strings[i] for i in self._ints("Csep"))
+        self.condition_prefix = tuple(strings[i] for i in self._ints("Ccnd"))
+        # everything is materialized; the mapping is not needed any more
+        self._buf = self._sections = None
+
+    def _bytes(self, name):
+        offset, length = self._sections[name]
+        return self._buf[offset:offset + length]
+
+    def _ints(self, name):
+        a = array("I")
+        a.frombytes(self._bytes(name))
+        if sys.byteorder != "little":
+            a.byteswap()
+        return a
+
+    def _entity_matcher(self, prefix, size):
+        strings = self.strings
+        first = self._ints(prefix + "edg")
+        chars = self._bytes(prefix + "chr").decode("utf-32-le")
+        targets = self._ints(prefix + "tgt").tolist()
+        # most trie nodes have zero or one edge; building those directly halves the load time
+        goto = [{} if a == b else {chars[a]: targets[a]} if b - a == 1 else dict(zip(chars[a:b], targets[a:b]))
+                for a, b in zip(first, first[1:])]
+        out = [(length, strings[name]) if length else None
+               for length, name in zip(self._ints(prefix + "oln"), self._ints(prefix + "onm"))]
+        fail = self._ints(prefix + "fai").tolist()
+        dict_link = self._ints(prefix + "dct").tolist()
+        return EntityMatcher.from_automaton(goto, fail, out, dict_link, size)
+
+    def _recognizer(self):
+        strings = self.strings
+        first = self._ints("Aedg")
+        tokens = self._ints("Atok")
+        targets = self._ints("Atgt")
+        nodes = [{} for _ in range(len(first) - 1)]
+        for n, kind in enumerate(self._ints("Akin")):
+            node = nodes[n]
+            for e in range(first[n], first[n + 1]):
+                node[strings[tokens[e]]] = nodes[targets[e]]
+            if kind:
+                node[None] = strings[kind - 1]
+        forms = dict(zip((strings[i] for i in self._ints("Afrm")), (strings[i] for i in self._ints("Alem"))))
+        return PhraseRecognizer.from_trie(nodes[0], forms)
+
+    def info(self):
+        return {"version": self.version, "path": self.path, "counts": self.counts}
+
+
+def open_snapshot(path):
+    """
+    Carga un snapshot por mmap: se leen solo las páginas de cada tabla, y
+    procesos que cargan el mismo fichero comparten la caché de páginas.
+    """
+    with open(path, "rb") as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return Lexicon(mm, path)
+
+
+def load(path=None, src=SOURCE_DIR):
+    """
+    Lexicón del servidor. Sin path, el snapshot por defecto: si las fuentes
+    de src han cambiado desde la última compilación se recompila antes
+    (en memoria si el directorio no se puede escribir).
+    """
+    if path is not None:
+        return open_snapshot(path)
+    path = SNAPSHOT_PATH
+    if os.path.isdir(src):
+        digest = source_digest(src)
+        if snapshot_digest(path) != digest:
+            data = compile_sources(src)
+            try:
+                write_snapshot(data, path)
+            except OSError:
+                return Lexicon(data, None)
+    return open_snapshot(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila los lexicones a un snapshot binario.")
+    parser.add_argument("--src", default=SOURCE_DIR, help="directorio con las fuentes")
+    parser.add_argument("--out", "-o", default=SNAPSHOT_PATH, help="fichero del snapshot")
+    args = parser.parse_args(argv)
+    try:
+        data = compile_sources(args.src)
+    except (OSError, LexiconError) as e:
+        raise SystemExit(str(e))
+    write_snapshot(data, args.out)
+    lexicon = Lexicon(data, args.out)
+    print(f"{args.out}: version {lexicon.version}, {len(data)} bytes, {json.dumps(lexicon.counts)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# -------------------------
+# Matcher de entidades (Aho–Corasick)
+# -------------------------
+# Encuentra en una sola pasada lineal todas las entradas del vocabulario que
+# aparecen como palabra completa ("pan" no casa dentro de "pantalla"),
+# independientemente del tamaño del vocabulario.
+
+_ACCENTS = str.maketrans("áéíóúü", "aeiouu")
+
+
+def fold(text):
+    """
+    Minúsculas + sin tildes (conserva la ñ), igual que normalize().
+    """
+    return text.lower().translate(_ACCENTS)
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class EntityMatcher:
+    """
+    Autómata Aho–Corasick sobre caracteres. Las entradas se pliegan con
+    fold() y las que llevan '_' se buscan con '_' y con espacios
+    ("punto_inicial" casa con "punto_inicial" y con "punto inicial"); el
+    nombre devuelto conserva los '_'.
+    """
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [None]  # (length, name) of the pattern ending at this node
+        self.size = 0
+        for word in words:
+            self.add(word)
+        self.build()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Una entrada por línea; se ignoran líneas vacías y comentarios '#'.
+        """
+        with open(path, encoding="utf-8") as fh:
+            return cls(load_lexicon(fh))
+
+    @classmethod
+    def from_automaton(cls, goto, fail, out, dict_link, size):
+        """
+        Reconstruye un autómata ya construido (ver lexicon.py) sin volver a
+        plegar entradas ni calcular enlaces de fallo.
+        """
+        self = cls.__new__(cls)
+        self.goto, self.fail, self.out, self.dict_link, self.size = goto, fail, out, dict_link, size
+        return self
+
+    def add(self, word):
+        name = fold(word.strip()).replace(" ", "_")
+        if not name:
+            return
+        if self._insert(name.replace("_", " "), name):
+            self.size += 1
+        if "_" in name:
+            # tokenize() keeps "pieza_dañada" as one word: match it literally too
+            self._insert(name, name)
+
+    def _insert(self, pattern, name):
+        """
+        Añade pattern al trie. Salida: True si no estaba.
+        """
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(None)
+            node = nxt
+        new = self.out[node] is None
+        self.out[node] = (len(pattern), name)
+        return new
+
+    def build(self):
+        """
+        Calcula los enlaces de fallo (BFS). Hay que llamarlo tras add().
+        """
+        self.dict_link = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for node in queue:
+            self.fail[node] = 0
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+            f = self.fail[node]
+            # nearest suffix state that ends a pattern
+            self.dict_link[node] = f if self.out[f] is not None else self.dict_link[f]
+
+    def iter_matches(self, text):
+        """
+        Todas las ocurrencias con límite de palabra: (start, end, name),
+        en orden de fin. text debe venir plegado (fold/normalize).
+        """
+        goto, fail, out, dict_link = self.goto, self.fail, self.out, self.dict_link
+        node = 0
+        n = len(text)
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            end = pos + 1
+            if end < n and _is_word_char(text[end]):
+                continue
+            hit = node if out[node] is not None else dict_link[node]
+            while hit:
+                length, name = out[hit]
+                start = end - length
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    yield start, end, name
+                hit = dict_link[hit]
+
+    def find_all(self, text):
+        """
+        Entidades sin solapamiento (la más larga gana a igual inicio),
+        en orden de aparición.
+        """
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], -m[1]))
+        chosen = []
+        last_end = 0
+        for start, end, name in matches:
+            if start >= last_end:
+                chosen.append((start, end, name))
+                last_end = end
+        return chosen
+
+    def find_names(self, text):
+        """
+        Nombres distintos en orden de aparición.
+        """
+        seen = []
+        for _, _, name in self.find_all(text):
+            if name not in seen:
+                seen.append(name)
+        return seen
+
+
+def load_lexicon(lines):
+    words = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            words.append(line)
+    return words
+
+
+# -------------------------
+# Reconocedor de frases verbales (longest match sobre n-gramas)
+# -------------------------
+class PhraseRecognizer:
+    """
+    Trie de tokens sobre las claves de un lexicón {frase: tipo}. Cada token
+    de entrada se canoniza con un índice de flexiones precalculado (forma ->
+    lema), así "usarla", "turning on" o "cierra" resuelven en una consulta
+    de diccionario por token, sin importar el tamaño del lexicón.
+    """
+
+    def __init__(self, lexicon, inflect=None):
+        self.trie = {}
+        heads = []
+        for phrase, kind in lexicon.items():
+            words = fold(phrase).split()
+            if not words:
+                continue
+            node = self.trie
+            for w in words:
+                node = node.setdefault(w, {})
+            node[None] = kind  # None key marks the end of a phrase
+            if words[0] not in heads:
+                heads.append(words[0])
+        # only phrase heads are inflected; inner tokens ("on", "agua") match literally
+        self.forms = inflect(heads) if inflect else {h: h for h in heads}
+
+    @classmethod
+    def from_trie(cls, trie, forms):
+        """
+        Reconstruye el reconocedor a partir del trie y el índice de
+        flexiones ya calculados (ver lexicon.py).
+        """
+        self = cls.__new__(cls)
+        self.trie, self.forms = trie, forms
+        return self
+
+    def recognize(self, tokens):
+        """
+        Salida: lista de (texto, tipo) sin solapamiento, en orden; en cada
+        posición gana la frase más larga del lexicón.
+        """
+        return [(" ".join(tokens[i:end]), kind) for i, end, kind in self.recognize_spans(tokens)]
+
+    def recognize_spans(self, tokens):
+        """
+        Como recognize pero sin copiar texto: lista de (i, end, tipo) con
+        los índices de token de cada frase (tokens[i:end]).
+        """
+        found = []
+        trie, forms = self.trie, self.forms
+        n = len(tokens)
+        i = 0
+        while i < n:
+            node = trie.get(forms.get(tokens[i]))
+            best = None
+            j = i + 1
+            while node is not None:
+                if None in node:
+                    best = (j, node[None])
+                if j >= n:
+                    break
+                node = node.get(tokens[j])
+                j += 1
+            if best:
+                end, kind = best
+                found.append((i, end, kind))
+                i = end
+            else:
+                i += 1
+        return found
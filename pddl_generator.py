@@ -1,513 +1,588 @@
+import hashlib
+import os
 import re
+import sys
+import threading
+import time
+from bisect import bisect_left
 from collections import OrderedDict
 
+import lexicon
+import metrics
+from step_ir import Step, dumps
+
 # -------------------------
-# LEXICON (mapa verbo -> tipo de acción)
+# Lexicón (lexicons/, compilado a un snapshot por lexicon.py)
 # -------------------------
-# Incluye español e inglés comunes. Ampliable.
-ACTION_LEXICON = {
-    # movimiento / transporte
-    "ir": "MOVE", "go": "MOVE", "walk": "MOVE", "move": "MOVE",
-    "llevar": "TRANSFER", "lleva": "TRANSFER", "carry": "TRANSFER", "take": "TRANSFER",
-    "traer": "BRING", "bring": "BRING", "fetch": "BRING",
-
-    # manipular objetos
-    "recoger": "PICK", "recoge": "PICK", "toma": "PICK", "agarrar": "PICK", "pick": "PICK",
-    "dejar": "PLACE", "colocar": "PLACE", "pon": "PLACE", "place": "PLACE", "put": "PLACE",
-
-    # abrir / cerrar
-    "abrir": "OPEN", "abre": "OPEN", "open": "OPEN",
-    "cerrar": "CLOSE", "cierra": "CLOSE", "close": "CLOSE",
-
-    # usar / usar llave
-    "usar": "USE", "usa": "USE", "use": "USE",
-
-    # cocinar / preparar
-    "hacer": "MAKE", "preparar": "MAKE", "prepare": "MAKE", "make": "MAKE",
-    "cocinar": "COOK", "cocina": "COOK", "cook": "COOK",
-    "hervir": "BOIL", "hervir agua": "BOIL", "boil": "BOIL",
-
-    # encender / apagar
-    "encender": "TURN_ON", "enciende": "TURN_ON", "turn on": "TURN_ON",
-    "apagar": "TURN_OFF", "apaga": "TURN_OFF", "turn off": "TURN_OFF",
-
-    # cargar / cargar bateria
-    "cargar": "CHARGE", "carga": "CHARGE", "charge": "CHARGE",
-
-    # limpiar
-    "limpiar": "CLEAN", "limpia": "CLEAN", "clean": "CLEAN",
-
-    # entregar / enviar
-    "entregar": "DELIVER", "entrega": "DELIVER", "deliver": "DELIVER",
-
-    # neutralizar (abstracto)
-    "neutralizar": "NEUTRALIZE", "neutraliza": "NEUTRALIZE", "eliminar": "NEUTRALIZE", "kill": "NEUTRALIZE",
-
-    # observar / localizar
-    "localizar": "LOCATE", "encontrar": "LOCATE", "find": "LOCATE", "buscar": "LOCATE",
-
-    # montar / ensamblar
-    "montar": "ASSEMBLE", "monta": "ASSEMBLE", "assemble": "ASSEMBLE",
+# Verbos -> tipo de acción, objetos, lugares y conectores, en español e
+# inglés. Todo el análisis lee un único objeto Lexicon: set_lexicon() cambia
+# la referencia de una vez y cada instrucción usa de principio a fin el que
+# estaba activo al empezar (generate_stages lo pasa como lex a cada etapa).
+_lexicon = lexicon.load(os.environ.get("LEXICON_SNAPSHOT"))
+_reload_lock = threading.Lock()
+
+def current_lexicon():
+    return _lexicon
+
+def set_lexicon(lex):
+    global _lexicon
+    _lexicon = lex
+    return lex
+
+def reload_lexicon(path=None):
+    """
+    Carga el snapshot (ver lexicon.load; sin path, el de por defecto,
+    recompilado si las fuentes cambiaron) y lo activa si es otra versión.
+    Salida: (lexicón activo, True si ha cambiado).
+    """
+    with _reload_lock:
+        lex = lexicon.load(path)
+        if lex.version == _lexicon.version:
+            return _lexicon, False
+        return set_lexicon(lex), True
 
-    # varias acciones útiles
-    "sacar": "REMOVE", "reemplazar": "REPLACE", "repara": "REPAIR", "reparar": "REPAIR"
-}
+def ensure_lexicon(version, path=None):
+    """
+    Para procesos worker: activa el snapshot de path si la versión activa
+    no es version.
+    """
+    if _lexicon.version != version:
+        reload_lexicon(path)
+    return _lexicon
 
 # -------------------------
-# Listas de objetos/lugares simples (NER por heurística)
+# Utilidades de parsing
 # -------------------------
-COMMON_OBJECTS = [
-    "manzana","manzanas","limon","limones","pera","peras","libro","llave","llaves","taza","tazas",
-    "cafe","café","pan","huevo","bateria","batería","pieza","pieza_dañada","paquete","juguete",
-    "chip","archivo","generador","tienda","cocina","casa","mesa","silla","estanteria","estantería",
-    "puerta","cofre","ventana","receptor","nucleo","planta","flor","gatito","gato","niño","niña"
-]
-COMMON_PLACES = [
-    "mesa","cocina","cuarto","habitación","habitacion","estanteria","estantería","cafeteria","cafetería",
-    "tienda","supermercado","puerta","laboratorio","laboratorio","base","inicio","punto_inicial","casa"
-]
+# lowercase + accent folding + '-'/'/' -> space in a single translate
+_FOLD_TABLE = str.maketrans({"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "-": " ", "/": " "})
+_TOKEN_RE = re.compile(r"\w+|[,;]")
 
 # -------------------------
-# Conectores y patrones de orden
+# Instrumentación (ver metrics.py; /metrics en app.py)
 # -------------------------
-ORDER_CONNECTORS = [
-    r"\bprimero\b", r"\bdespués\b", r"\bluego\b", r"\bantes de\b", r"\bdespues de\b",
-    r"\bpero solo después de\b", r"\bpero solo despues de\b", r"\bpero despues de\b",
-    r"\bthen\b", r"\bafter\b", r"\bbefore\b"
-]
+STAGE_SECONDS = metrics.histogram(
+    "pddl_stage_seconds", "Time spent in each generation stage.", ["stage"])
+STEPS_PER_INSTRUCTION = metrics.histogram(
+    "pddl_steps_per_instruction", "Steps extracted per instruction.", buckets=metrics.COUNT_BUCKETS)
 
-SPLIT_SEPARATORS = [r"\by luego\b", r"\by después\b", r"\b y luego\b", r"\b, y\b", r"\b y\b", r";"]
-
-# -------------------------
-# Utilidades de parsing
-# -------------------------
 def normalize(text):
-    t = text.lower()
-    t = t.replace("á","a").replace("é","e").replace("í","i").replace("ó","o").replace("ú","u")
-    # unify punctuation spacing
-    t = re.sub(r"[-/]", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
-
-def find_objects(tokens):
-    found = []
-    for o in COMMON_OBJECTS:
-        if o in tokens:
-            found.append(o.replace(" ", "_"))
-    return found
-
-def find_places(tokens):
-    found = []
-    for p in COMMON_PLACES:
-        if p in tokens:
-            found.append(p.replace(" ", "_"))
-    return found
-
-def find_actions(tokens):
-    acts = []
-    for i, tok in enumerate(tokens):
-        # check two-word verbs first
-        if i+1 < len(tokens):
-            two = f"{tok} {tokens[i+1]}"
-            if two in ACTION_LEXICON:
-                acts.append((two, ACTION_LEXICON[two]))
-                continue
-        if tok in ACTION_LEXICON:
-            acts.append((tok, ACTION_LEXICON[tok]))
-    return acts
+    return " ".join(text.lower().translate(_FOLD_TABLE).split())
+
+def tokenize(text):
+    """
+    Normaliza y tokeniza en una sola pasada.
+    Salida: (normalized, tokens) con tokens = [(tok, start, end), ...];
+    los offsets apuntan a normalized y los comparten todas las etapas.
+    """
+    norm = normalize(text)
+    return norm, [(m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(norm)]
+
+def step_spans(tokens, lex=None):
+    """
+    Agrupa el stream de tokens en pasos cortando en los conectores.
+    Salida: lista de (i, j) con los tokens tokens[i:j] de cada paso.
+    """
+    lex = lex or _lexicon
+    separators, prefix = lex.separators, lex.condition_prefix
+    spans = []
+    start = 0
+    for k, tok in enumerate(tokens):
+        if tok[0] in separators and not _in_condition_prefix(tokens, k, prefix):
+            if k > start:
+                spans.append((start, k))
+            start = k + 1
+    if start < len(tokens):
+        spans.append((start, len(tokens)))
+    return spans
+
+def _in_condition_prefix(tokens, k, prefix):
+    # "despues" inside "pero solo despues de" opens a condition, it does not end a step
+    n = len(prefix)
+    for p, word in enumerate(prefix):
+        if word == tokens[k][0] and k >= p and tuple(t[0] for t in tokens[k - p:k - p + n]) == prefix:
+            return True
+    return False
+
+def find_objects(text, lex=None):
+    # word-bounded matches in text order (single Aho–Corasick pass)
+    return (lex or _lexicon).object_matcher.find_names(text)
+
+def find_places(text, lex=None):
+    return (lex or _lexicon).place_matcher.find_names(text)
+
+def find_actions(tokens, lex=None):
+    # longest n-gram match; conjugated forms resolve through the inflection index
+    return (lex or _lexicon).action_recognizer.recognize(tokens)
+
+def find_action_spans(tokens, lex=None):
+    # same as find_actions, as (i, end, type) token indices
+    return (lex or _lexicon).action_recognizer.recognize_spans(tokens)
+
+def _names_between(matches, starts, start, end):
+    # starts[k] == matches[k][0]; bisect skips the matches of earlier steps
+    names = []
+    for k in range(bisect_left(starts, start), len(matches)):
+        s, e, name = matches[k]
+        if s >= end:
+            break
+        if e <= end and name not in names:
+            names.append(name)
+    return names
 
 # -------------------------
 # Extraer pasos (secuencia) simple
 # -------------------------
-def split_into_steps(text):
+def split_into_steps(text, lex=None):
     """
-    Divide la instrucción en pasos usando comas, 'y', 'luego', 'después', 'antes de', 'primero'...
+    Divide la instrucción en pasos usando comas, 'y', 'luego', 'después', 'then', 'and'...
     Mantiene un orden aproximado.
     """
-    txt = normalize(text)
-    # split by explicit separators conservatively
-    parts = re.split(r",|;| y luego | y | luego | despues | después | then | and then | and ", txt)
-    steps = [p.strip() for p in parts if p.strip()]
-    # handle "pero solo despues de X" by merging if necessary - we will process conditions later
-    return steps
+    norm, tokens = tokenize(text)
+    return [norm[tokens[i][1]:tokens[j - 1][2]] for i, j in step_spans(tokens, lex)]
 
 # -------------------------
 # Construcción de plan intermedio (lista de pasos con action/object/place/cond)
 # -------------------------
-def build_plan_steps(text):
-    steps_raw = split_into_steps(text)
+def build_plan_steps(text, tokens=None, lex=None):
+    """
+    text: instrucción cruda, o ya normalizada si se pasan sus tokens (tokenize).
+    lex: Lexicon a usar (por defecto, el activo).
+    Salida: lista de Step (ver step_ir) con offsets en el texto normalizado.
+    """
+    if tokens is None:
+        text, tokens = tokenize(text)
+    lex = lex or _lexicon
+    condition_prefix = lex.condition_prefix
+    t0 = time.perf_counter()
+    # entities are matched once over the whole text and bucketed by step offsets
+    objects_at = lex.object_matcher.find_all(text)
+    places_at = lex.place_matcher.find_all(text)
+    object_starts = [m[0] for m in objects_at]
+    place_starts = [m[0] for m in places_at]
+    t1 = time.perf_counter()
+    STAGE_SECONDS.observe(t1 - t0, stage="find_entities")
+    spans = step_spans(tokens, lex)
+    STAGE_SECONDS.observe(time.perf_counter() - t1, stage="split_steps")
+    action_time = 0.0
     plan_steps = []
-    for step in steps_raw:
-        tokens = [t.strip() for t in re.split(r"\s+", normalize(step))]
-        actions = find_actions(tokens)
-        objects = find_objects(step)
-        places = find_places(step)
-        # simple heuristics: pick first action found, first object/place
+    for i, j in spans:
+        start, end = tokens[i][1], tokens[j - 1][2]
+        words = [t[0] for t in tokens[i:j]]
+        ta = time.perf_counter()
+        actions = find_action_spans(words, lex)
+        action_time += time.perf_counter() - ta
+        objects = _names_between(objects_at, object_starts, start, end)
+        places = _names_between(places_at, place_starts, start, end)
+        # simple heuristics: pick first action found (else the first word), first object/place
         if actions:
-            verb_text, verb_type = actions[0]
+            a, b, verb_type = actions[0]
         else:
-            # fallback: try to derive from infinitives
-            verb_type = None
-            for tok in tokens:
-                # Spanish infinitive heuristic
-                if tok.endswith(("ar","er","ir")):
-                    # map common endings to MAKE or PICK heuristically
-                    if tok in ("hacer","preparar","cocinar"):
-                        verb_type = "MAKE"
-                    else:
-                        verb_type = "DEFAULT"
-                    break
-            if verb_type is None:
-                verb_type = "DEFAULT"
-            verb_text = tokens[0] if tokens else "do"
-        # detect conditional pre/post phrases (e.g., "pero solo después de hervir el agua")
-        condition = None
-        m = re.search(r"pero solo despu[eé]s de (.+)$", step)
-        if not m:
-            m = re.search(r"pero solo despues de (.+)$", step)
-        if m:
-            condition = m.group(1).strip()
-        # detect "antes de X" => this step should be before X
-        before_match = re.search(r"(.+) antes de (.+)$", step)
-        if before_match:
-            # treat as two-step: do before_match.group(1) then group(2)
-            # We'll let split_into_steps have probably separated them; if not, leave condition
-            pass
-
-        plan_steps.append({
-            "raw": step,
-            "verb_text": verb_text,
-            "action": verb_type,
-            "object": objects[0] if objects else None,
-            "place": places[0] if places else None,
-            "condition": condition
-        })
+            a, b, verb_type = 0, 1, "DEFAULT"
+        # detect conditional phrases (e.g., "pero solo después de hervir el agua")
+        cond_start = None
+        for k in range(len(words) - len(condition_prefix)):
+            if tuple(words[k:k + len(condition_prefix)]) == condition_prefix:
+                cond_start = tokens[i + k + len(condition_prefix)][1]
+                break
+
+        plan_steps.append(Step(
+            text, start, end, tokens[i + a][1], tokens[i + b - 1][2], verb_type,
+            objects[0] if objects else None,
+            places[0] if places else None,
+            cond_start,
+        ))
+    # accumulated over the steps: one observation per instruction, not per step
+    STAGE_SECONDS.observe(action_time, stage="find_actions")
     return plan_steps
 
+def execution_order(steps, lex=None):
+    """
+    Índices de steps en orden de ejecución. Un paso que empieza por la
+    condición ("..., pero solo después de hervir el agua") va antes del paso
+    anterior; si la condición está dentro del paso ("preparar té pero solo
+    después de hervir el agua"), el paso cuya acción nombra va antes que él.
+    Coste: O(n) más los pasos que salta cada paso movido (cuadrático en el
+    peor caso, si muchas condiciones nombran pasos lejanos).
+    """
+    order = list(range(len(steps)))
+    position = list(range(len(steps)))  # position[i]: where step i is in order
+    # first two steps of each action: the first one may be the conditioned step itself
+    by_action = {}
+    for j, s in enumerate(steps):
+        first = by_action.setdefault(s.action, [])
+        if len(first) < 2:
+            first.append(j)
+    for k, s in enumerate(steps):
+        if s.cond_start is None:
+            continue
+        pos = position[k]
+        if s.cond_start <= s.verb_start:
+            if pos > 0:
+                prev = order[pos - 1]
+                order[pos - 1], order[pos] = k, prev
+                position[k], position[prev] = pos - 1, pos
+            continue
+        named = find_action_spans(s.condition.split(), lex)
+        if not named:
+            continue
+        j = next((j for j in by_action.get(named[0][2], ()) if j != k), None)
+        if j is not None and position[j] > pos:
+            # move j right before k; the steps in between shift, O(distance)
+            end = position[j]
+            order[pos + 1:end + 1] = order[pos:end]
+            order[pos] = j
+            for p in range(pos, end + 1):
+                position[order[p]] = p
+    return order
+
 # -------------------------
 # Generador de dominio dinámico (basado en las acciones presentes)
 # -------------------------
-def build_domain_for_actions(actions_present):
-    """
-    Construye un dominio que contiene definiciones para acciones comunes.
-    Agrega step predicates (step-done-1, ... ) para forzar secuencia si es necesario.
-    """
-    # common predicates
-    preds = [
-        "  (:predicates",
-        "    (at ?a - agent ?l - location)",
-        "    (in ?o - object ?l - location)",
-        "    (has ?a - agent ?o - object)",
-        "    (prepared ?o - object)",
-        "    (heated ?o - object)",
-        "    (open ?p - object)",
-        "    (closed ?p - object)",
-        "    (charged ?o - object)",
-        "    (clean ?o - object)",
-        "    (neutralized ?t - target)",
-    ]
-    # add step predicates in case we want to enforce ordering; created dynamically later when used
-    domain_actions = []
-
-    # helper to add action templates for common action types
-    def add_move():
-        domain_actions.append("""
+# Fragments are built once at import; a domain only depends on the set of
+# action types, so finished domains are memoized in a bounded LRU.
+DOMAIN_HEADER = "(define (domain generated_domain)\n  (:requirements :strips :typing)\n  (:types agent object location target)\n" + "\n".join([
+    "  (:predicates",
+    "    (at ?a - agent ?l - location)",
+    "    (in ?o - object ?l - location)",
+    "    (has ?a - agent ?o - object)",
+    "    (prepared ?o - object)",
+    "    (heated ?o - object)",
+    "    (open ?p - object)",
+    "    (closed ?p - object)",
+    "    (charged ?o - object)",
+    "    (clean ?o - object)",
+    "    (neutralized ?t - target)",
+    "  )",
+]) + "\n"
+
+# action templates (one per PDDL action)
+ACTION_TEMPLATES = {
+    "move": """
   (:action move
     :parameters (?a - agent ?from - location ?to - location)
     :precondition (at ?a ?from)
     :effect (and (not (at ?a ?from)) (at ?a ?to))
-  )""")
-    def add_pick():
-        domain_actions.append("""
+  )""",
+    "pick": """
   (:action pick
     :parameters (?a - agent ?o - object ?l - location)
     :precondition (and (at ?a ?l) (in ?o ?l))
     :effect (and (not (in ?o ?l)) (has ?a ?o))
-  )""")
-    def add_place():
-        domain_actions.append("""
+  )""",
+    "place": """
   (:action place
     :parameters (?a - agent ?o - object ?l - location)
     :precondition (has ?a ?o)
     :effect (and (not (has ?a ?o)) (in ?o ?l))
-  )""")
-    def add_open():
-        domain_actions.append("""
+  )""",
+    "open": """
   (:action open
     :parameters (?a - agent ?p - object)
     :precondition ()
     :effect (open ?p)
-  )""")
-    def add_close():
-        domain_actions.append("""
+  )""",
+    "close": """
   (:action close
     :parameters (?a - agent ?p - object)
     :precondition ()
     :effect (closed ?p)
-  )""")
-    def add_use():
-        domain_actions.append("""
+  )""",
+    "use": """
   (:action use
     :parameters (?a - agent ?o - object ?t - object)
     :precondition (has ?a ?o)
     :effect ()
-  )""")
-    def add_prepare():
-        domain_actions.append("""
+  )""",
+    "prepare": """
   (:action prepare
     :parameters (?a - agent ?o - object ?ap - object)
     :precondition (has ?a ?o)
     :effect (prepared ?o)
-  )""")
-    def add_boil():
-        domain_actions.append("""
+  )""",
+    "boil": """
   (:action boil
     :parameters (?a - agent ?o - object ?k - object)
     :precondition ()
     :effect (heated ?o)
-  )""")
-    def add_turn_on():
-        domain_actions.append("""
+  )""",
+    "turn_on": """
   (:action turn_on
     :parameters (?a - agent ?d - object)
     :precondition ()
     :effect ()
-  )""")
-    def add_clean():
-        domain_actions.append("""
+  )""",
+    "clean": """
   (:action clean
     :parameters (?a - agent ?o - object)
     :precondition ()
     :effect (clean ?o)
-  )""")
-    def add_charge():
-        domain_actions.append("""
+  )""",
+    "charge": """
   (:action charge
     :parameters (?a - agent ?b - object)
     :precondition ()
     :effect (charged ?b)
-  )""")
-    def add_neutralize():
-        domain_actions.append("""
+  )""",
+    "neutralize": """
   (:action neutralize
     :parameters (?a - agent ?t - target)
     :precondition ()
     :effect (neutralized ?t)
-  )""")
-    def add_locate():
-        domain_actions.append("""
+  )""",
+    "locate": """
   (:action locate
     :parameters (?a - agent ?o - object ?l - location)
     :precondition ()
     :effect (in ?o ?l)
-  )""")
-    def add_deliver():
-        domain_actions.append("""
+  )""",
+    "deliver": """
   (:action deliver
     :parameters (?a - agent ?o - object ?from - location ?to - location)
     :precondition (and (in ?o ?from) (at ?a ?from))
     :effect (and (not (in ?o ?from)) (in ?o ?to))
-  )""")
-    def add_assemble():
-        domain_actions.append("""
+  )""",
+    "assemble": """
   (:action assemble
     :parameters (?a - agent ?part - object ?product - object)
     :precondition ()
     :effect ()
-  )""")
-
-    # Map action type to templates
-    mapping = {
-        "MOVE": add_move,
-        "PICK": add_pick,
-        "PLACE": add_place,
-        "OPEN": add_open,
-        "CLOSE": add_close,
-        "USE": add_use,
-        "MAKE": add_prepare,
-        "COOK": add_prepare,
-        "BOIL": add_boil,
-        "TURN_ON": add_turn_on,
-        "TURN_OFF": add_turn_on,
-        "CLEAN": add_clean,
-        "CHARGE": add_charge,
-        "NEUTRALIZE": add_neutralize,
-        "LOCATE": add_locate,
-        "DELIVER": add_deliver,
-        "TRANSFER": add_deliver,
-        "BRING": add_deliver,
-        "ASSEMBLE": add_assemble,
-        "REPAIR": add_assemble,
-        "REMOVE": add_assemble,
-        "REPLACE": add_assemble
-    }
+  )""",
+}
 
-    for a in sorted(set(actions_present)):
-        fn = mapping.get(a)
-        if fn:
-            fn()
-        else:
-            # add a generic action for unknown ones
-            domain_actions.append(f"""
-  (:action {a.lower()}
+# action type -> template
+ACTION_TYPE_TEMPLATES = {
+    "MOVE": ACTION_TEMPLATES["move"],
+    "PICK": ACTION_TEMPLATES["pick"],
+    "PLACE": ACTION_TEMPLATES["place"],
+    "OPEN": ACTION_TEMPLATES["open"],
+    "CLOSE": ACTION_TEMPLATES["close"],
+    "USE": ACTION_TEMPLATES["use"],
+    "MAKE": ACTION_TEMPLATES["prepare"],
+    "COOK": ACTION_TEMPLATES["prepare"],
+    "BOIL": ACTION_TEMPLATES["boil"],
+    "TURN_ON": ACTION_TEMPLATES["turn_on"],
+    "TURN_OFF": ACTION_TEMPLATES["turn_on"],
+    "CLEAN": ACTION_TEMPLATES["clean"],
+    "CHARGE": ACTION_TEMPLATES["charge"],
+    "NEUTRALIZE": ACTION_TEMPLATES["neutralize"],
+    "LOCATE": ACTION_TEMPLATES["locate"],
+    "DELIVER": ACTION_TEMPLATES["deliver"],
+    "TRANSFER": ACTION_TEMPLATES["deliver"],
+    "BRING": ACTION_TEMPLATES["deliver"],
+    "ASSEMBLE": ACTION_TEMPLATES["assemble"],
+    "REPAIR": ACTION_TEMPLATES["assemble"],
+    "REMOVE": ACTION_TEMPLATES["assemble"],
+    "REPLACE": ACTION_TEMPLATES["assemble"],
+}
+
+DOMAIN_CACHE_SIZE = 4096
+_domain_cache = OrderedDict()
+_domain_lock = threading.Lock()
+
+def _generic_action(action_type):
+    return f"""
+  (:action {action_type.lower()}
     :parameters (?a - agent ?x - object)
     :precondition ()
     :effect ()
-  )""")
+  )"""
 
-    # close predicates list
-    preds.append("  )")
-    domain = "(define (domain generated_domain)\n  (:requirements :strips :typing)\n  (:types agent object location target)\n"
-    domain += "\n".join(preds) + "\n"
-    domain += "\n".join(domain_actions) + "\n)\n"
-    return domain
+def get_domain(actions_present):
+    """
+    Devuelve (domain_text, etag) para el conjunto de tipos de acción.
+    El texto está internado: conjuntos iguales devuelven el mismo objeto str,
+    y el etag (sha1 del texto) es estable entre procesos.
+    """
+    key = frozenset(actions_present)
+    with _domain_lock:
+        hit = _domain_cache.get(key)
+        if hit is not None:
+            _domain_cache.move_to_end(key)
+            return hit
+    domain = sys.intern("".join(iter_domain_chunks(key)))
+    entry = (domain, hashlib.sha1(domain.encode("utf-8")).hexdigest())
+    with _domain_lock:
+        entry = _domain_cache.setdefault(key, entry)
+        while len(_domain_cache) > DOMAIN_CACHE_SIZE:
+            _domain_cache.popitem(last=False)
+    return entry
+
+def iter_domain_chunks(actions_present):
+    """
+    Texto del dominio por trozos: cabecera, una acción por tipo, cierre.
+    """
+    yield DOMAIN_HEADER
+    for i, action_type in enumerate(sorted(set(actions_present))):
+        if i:
+            yield "\n"
+        yield ACTION_TYPE_TEMPLATES.get(action_type) or _generic_action(action_type)
+    yield "\n)\n"
+
+def build_domain_for_actions(actions_present):
+    """
+    Construye un dominio que contiene definiciones para acciones comunes.
+    Memoizado por conjunto de tipos de acción (ver get_domain).
+    """
+    return get_domain(actions_present)[0]
 
 # -------------------------
 # Construcción de problem específico
 # -------------------------
-def build_problem_from_steps(steps, metadata=None):
+# The problem is emitted as a stream of small chunks so huge instructions can
+# be written straight to a file (fh.writelines(...)) or an HTTP response
+# without building the text in memory. Steps are walked three times (names,
+# init, goal), so they must be a list or another re-iterable collection;
+# only the sets of object and location names are kept. Goals are listed in
+# execution order (see execution_order), which planner.solve(ordered=True)
+# uses as the subgoal sequence.
+def _step_facts(s, step_index):
     """
-    steps: lista ordenada de dicts {action, object, place, condition, raw}
-    Crea objetos, init facts y goal(s) adaptados.
+    Hechos de un paso: (init fact o None, goal).
     """
+    action = s.action
+    objname = s.object_id
+    place_name = s.place_id
+
+    # Decide init facts and goals per action type
+    if action in ("PICK","PICK_UP","PICKUP"):
+        # object must be at a location (home if none) -> goal: has robot object
+        return f"(in {objname} {place_name or 'home'})", f"(has robot {objname})"
+    if action in ("PLACE","PUT","TRANSFER","BRING","DELIVER"):
+        # goal: object at place_name; if no destination, place at home
+        return None, f"(in {objname} {place_name or 'home'})"
+    if action in ("OPEN",):
+        return None, f"(open {objname or 'door'})"
+    if action in ("CLOSE",):
+        return None, f"(closed {objname or 'door'})"
+    if action in ("MAKE","COOK","PREPARE","BOIL"):
+        # goal: prepared <object>
+        return None, f"(prepared {objname or ('dish' + str(step_index))})"
+    if action in ("TURN_ON",):
+        return None, f"(on {objname or 'device'})"
+    if action in ("CHARGE",):
+        return None, f"(charged {objname or 'battery'})"
+    if action in ("CLEAN",):
+        return None, f"(clean {objname or 'object'})"
+    if action in ("NEUTRALIZE",):
+        # neutralize target: use target type predicate
+        return None, f"(neutralized {objname or ('target' + str(step_index))})"
+    if action in ("LOCATE", "FIND"):
+        # goal: object at some known place
+        return None, f"(in {objname or 'object'} {place_name or 'home'})"
+    # generic
+    return None, "(done robot)"
+
+def iter_problem_chunks(steps, lex=None):
+    """
+    steps: lista de Step en el orden del texto; lex: el Lexicon con que se
+    extrajeron (para el orden de ejecución)
+    Produce el texto del problem por trozos, en tiempo lineal.
+    """
+    # pass 1: names (default agent and home; the agent must be typed so actions can bind ?a - agent)
     objs = set()
-    locs = set()
-    init = []
-    goals = []
-    # default agent and home
-    objs.add("robot")
-    locs.add("home")
-
-    # track steps to create ordered sub-goals if necessary
-    step_index = 0
+    locs = {"home"}
+    count = 0
     for s in steps:
-        step_index += 1
-        action = s.get("action", "DEFAULT")
-        obj = s.get("object")
-        place = s.get("place")
-        raw = s.get("raw", "")
-        # normalize names
-        if obj:
-            objname = obj.replace(" ", "_")
-            objs.add(objname)
-        else:
-            objname = None
-        if place:
-            place_name = place.replace(" ", "_")
-            locs.add(place_name)
-        else:
-            place_name = None
-
-        # Decide init facts and goals per action type
-        if action in ("PICK","PICK_UP","PICKUP"):
-            # object must be at a location -> goal: has robot object
-            if not place_name:
-                # if no place, assume object is at home
-                init.append(f"(in {objname} home)")
-            else:
-                init.append(f"(in {objname} {place_name})")
-            goals.append(f"(has robot {objname})")
-        elif action in ("PLACE","PUT","TRANSFER","BRING","DELIVER"):
-            # goal: object at place_name
-            if place_name:
-                goals.append(f"(in {objname} {place_name})")
-            else:
-                # if no destination, place at home
-                goals.append(f"(in {objname} home)")
-        elif action in ("OPEN",):
-            goals.append(f"(open {objname or 'door'})")
-        elif action in ("CLOSE",):
-            goals.append(f"(closed {objname or 'door'})")
-        elif action in ("MAKE","COOK","PREPARE","BOIL"):
-            # goal: prepared <object>
-            target = objname or ("dish" + str(step_index))
-            goals.append(f"(prepared {target})")
-        elif action in ("TURN_ON",):
-            goals.append(f"(on {objname or 'device'})")
-        elif action in ("CHARGE",):
-            goals.append(f"(charged {objname or 'battery'})")
-        elif action in ("CLEAN",):
-            goals.append(f"(clean {objname or 'object'})")
-        elif action in ("NEUTRALIZE",):
-            # neutralize target: use target type predicate
-            target = objname or ("target" + str(step_index))
-            goals.append(f"(neutralized {target})")
-        elif action in ("LOCATE", "FIND"):
-            # goal: object at some known place
-            goals.append(f"(in {objname or 'object'} {place_name or 'home'})")
-        elif action in ("DELIVER",):
-            goals.append(f"(in {objname} {place_name or 'home'})")
-        else:
-            # generic
-            goals.append(f"(done robot)")
+        count += 1
+        if s.object:
+            objs.add(s.object_id)
+        if s.place:
+            locs.add(s.place_id)
 
-    # Build objects and init strings
-    objects_decl = []
+    yield "(define (problem generated-problem)\n  (:domain generated_domain)\n  \n  (:objects \n    robot - agent"
     if objs:
-        objects_decl.append(" ".join(sorted(objs)) + " - object") if len(objs)>0 else None
-    if locs:
-        # list locations separately
-        objects_decl.append(" ".join(sorted(locs)) + " - location")
-
-    # ensure there's at least some objects
-    if not objects_decl:
-        objects_decl = ["robot - agent", "home - location"]
-
-    # Compose init
-    init_lines = ""
-    if init:
-        for f in init:
-            init_lines += f"    {f}\n"
-    else:
-        init_lines = "    (at robot home)\n"
-
-    # Compose goal: if multiple goals, set as conjunction
-    goal_lines = ""
-    if len(goals) == 1:
-        goal_block = f"{goals[0]}"
-    else:
-        # prefer to require last goal if it's a sequence; but also allow conjunction — here we use conjunction
-        goal_block = "(and\n"
-        for g in goals:
-            goal_block += f"    {g}\n"
-        goal_block += ")"
-
-    # final problem text
-    objects_text = "\n  (:objects " + "\n    " + "\n    ".join(objects_decl) + ")\n"
-    problem = f"""(define (problem generated-problem)
-  (:domain generated_domain)
-  {objects_text}
-  (:init
-{init_lines}  )
-  (:goal {goal_block})
-)
-"""
-    return problem
+        yield "\n    " + " ".join(sorted(objs)) + " - object"
+    yield "\n    " + " ".join(sorted(locs)) + " - location)\n"
+    del objs, locs
+
+    # pass 2: init (the agent always starts at home)
+    yield "\n  (:init\n    (at robot home)\n"
+    for step_index, s in enumerate(steps, 1):
+        fact = _step_facts(s, step_index)[0]
+        if fact:
+            yield f"    {fact}\n"
+    yield "  )\n"
+
+    # pass 3: goal, a conjunction unless there is exactly one (one goal per step)
+    if count == 1:
+        for s in steps:
+            yield f"  (:goal {_step_facts(s, 1)[1]})\n)\n"
+        return
+    yield "  (:goal (and\n"
+    for k in execution_order(steps, lex):
+        yield f"    {_step_facts(steps[k], k + 1)[1]}\n"
+    yield "))\n)\n"
+
+def build_problem_from_steps(steps, metadata=None, lex=None):
+    """
+    Crea objetos, init facts y goal(s) adaptados (ver iter_problem_chunks).
+    """
+    return "".join(iter_problem_chunks(steps, lex))
+
+def coalesce(chunks, size=64 * 1024):
+    """
+    Agrupa trozos pequeños en bloques de ~size caracteres (para respuestas
+    HTTP por chunks sin una escritura por línea).
+    """
+    buf = []
+    buffered = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield "".join(buf)
 
 # -------------------------
 # API method: main generator
 # -------------------------
-def generate_pddl_from_instruction(nl_text):
+def generate_stages(nl_text, lex=None):
     """
-    Entrada: cadena en ES/EN
-    Salida: dict {domain, problem, meta}
+    Igual que generate_pddl_from_instruction pero por etapas, para poder
+    emitir cada una en cuanto está lista.
+    Produce ("steps", steps), ("domain", domain), ("problem", problem) y
+    por último ("result", {domain, problem, meta}).
     """
+    # read once: a reload mid-instruction must not mix two lexicons
+    lex = lex or _lexicon
     raw = nl_text or ""
-    text = normalize(raw)
+    with STAGE_SECONDS.time(stage="normalize"):
+        text, tokens = tokenize(raw)
 
-    steps = build_plan_steps(text)
+    with STAGE_SECONDS.time(stage="build_steps"):
+        steps = build_plan_steps(text, tokens, lex)
+    STEPS_PER_INSTRUCTION.observe(len(steps))
+    yield "steps", steps
     # create domain based on actions present
-    actions_present = [s.get("action","DEFAULT") for s in steps]
-    domain_text = build_domain_for_actions(actions_present)
-    problem_text = build_problem_from_steps(steps)
+    actions_present = [s.action for s in steps]
+    with STAGE_SECONDS.time(stage="build_domain"):
+        domain_text, domain_etag = get_domain(actions_present)
+    yield "domain", domain_text
+    with STAGE_SECONDS.time(stage="build_problem"):
+        problem_text = build_problem_from_steps(steps, lex=lex)
+    yield "problem", problem_text
 
     meta = {
         "raw": raw,
         "normalized": text,
         "steps": steps,
-        "actions_present": actions_present
+        "actions_present": actions_present,
+        "domain_etag": domain_etag,
+        "lexicon_version": lex.version,
     }
-    return {"domain": domain_text, "problem": problem_text, "meta": meta}
+    yield "result", {"domain": domain_text, "problem": problem_text, "meta": meta}
+
+def generate_pddl_from_instruction(nl_text, lex=None):
+    """
+    Entrada: cadena en ES/EN
+    Salida: dict {domain, problem, meta}
+    """
+    for stage, value in generate_stages(nl_text, lex):
+        if stage == "result":
+            return value
 
 # -------------
 # Ejemplos rápidos (si ejecutas este archivo directamente para pruebas)
@@ -528,5 +603,5 @@ if __name__ == "__main__":
         print("--- PROBLEM ---")
         print(out["problem"])
         print("--- META ---")
-        print(out["meta"])
+        print(dumps(out["meta"]))
         print("\n" + "="*60 + "\n")
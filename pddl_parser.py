@@ -0,0 +1,188 @@
+import re
+
+# -------------------------
+# Parser PDDL mínimo (fragmento STRIPS + typing)
+# -------------------------
+# Cubre lo que emiten build_domain_for_actions / build_problem_from_steps:
+# tipos planos, predicados, acciones con precondiciones/efectos conjuntivos,
+# objetos tipados, init y goal conjuntivos.
+
+_TOKEN_RE = re.compile(r"\(|\)|[^\s()]+")
+_COMMENT_RE = re.compile(r";[^\n]*")
+
+
+class PDDLParseError(ValueError):
+    pass
+
+
+def parse_sexpr(text):
+    """
+    Convierte texto PDDL en listas anidadas de tokens (en minúsculas).
+    """
+    tokens = _TOKEN_RE.findall(_COMMENT_RE.sub("", text).lower())
+    stack = [[]]
+    for tok in tokens:
+        if tok == "(":
+            stack.append([])
+        elif tok == ")":
+            if len(stack) == 1:
+                raise PDDLParseError("unbalanced ')'")
+            done = stack.pop()
+            stack[-1].append(done)
+        else:
+            stack[-1].append(tok)
+    if len(stack) != 1:
+        raise PDDLParseError("unbalanced '('")
+    if len(stack[0]) != 1 or not isinstance(stack[0][0], list):
+        raise PDDLParseError("expected a single (define ...) form")
+    return stack[0][0]
+
+
+def parse_typed_list(items):
+    """
+    ['a', 'b', '-', 't', 'c'] -> [('a','t'), ('b','t'), ('c','object')]
+    """
+    out = []
+    pending = []
+    i = 0
+    while i < len(items):
+        tok = items[i]
+        if tok == "-":
+            if i + 1 >= len(items):
+                raise PDDLParseError("dangling '-' in typed list")
+            typ = items[i + 1]
+            out.extend((name, typ) for name in pending)
+            pending = []
+            i += 2
+            continue
+        pending.append(tok)
+        i += 1
+    out.extend((name, "object") for name in pending)
+    return out
+
+
+def _atom(expr):
+    if not isinstance(expr, list) or not expr or isinstance(expr[0], list):
+        raise PDDLParseError(f"expected an atom, got {expr!r}")
+    return tuple(expr)
+
+
+def parse_condition(expr):
+    """
+    Precondición/goal conjuntivo -> lista de átomos (tuplas).
+    """
+    if expr == []:
+        return []
+    if expr[0] == "and":
+        atoms = []
+        for sub in expr[1:]:
+            atoms.extend(parse_condition(sub))
+        return atoms
+    if expr[0] in ("not", "or", "imply", "exists", "forall", "when"):
+        raise PDDLParseError(f"unsupported condition '{expr[0]}' (STRIPS only)")
+    return [_atom(expr)]
+
+
+def parse_effect(expr):
+    """
+    Efecto conjuntivo -> (add, delete) como listas de átomos.
+    """
+    if expr == []:
+        return [], []
+    if expr[0] == "and":
+        add, delete = [], []
+        for sub in expr[1:]:
+            a, d = parse_effect(sub)
+            add.extend(a)
+            delete.extend(d)
+        return add, delete
+    if expr[0] == "not":
+        return [], [_atom(expr[1])]
+    if expr[0] in ("when", "forall", "increase", "decrease"):
+        raise PDDLParseError(f"unsupported effect '{expr[0]}' (STRIPS only)")
+    return [_atom(expr)], []
+
+
+def _sections(tree, kind):
+    if not tree or tree[0] != "define":
+        raise PDDLParseError("expected (define ...)")
+    head = tree[1] if len(tree) > 1 else None
+    if not isinstance(head, list) or len(head) != 2 or head[0] != kind:
+        raise PDDLParseError(f"expected ({kind} <name>)")
+    return head[1], tree[2:]
+
+
+def _action(body):
+    name = body[1]
+    fields = {}
+    i = 2
+    while i + 1 < len(body):
+        fields[body[i]] = body[i + 1]
+        i += 2
+    params = parse_typed_list(fields.get(":parameters", []))
+    add, delete = parse_effect(fields.get(":effect", []))
+    return {
+        "name": name,
+        "params": params,
+        "pre": parse_condition(fields.get(":precondition", [])),
+        "add": add,
+        "del": delete,
+    }
+
+
+def parse_domain(text):
+    """
+    Salida: dict {name, types, predicates, actions}
+    types es un mapa hijo -> padre; 'object' es la raíz.
+    """
+    name, body = _sections(parse_sexpr(text), "domain")
+    domain = {"name": name, "types": {}, "predicates": {}, "actions": []}
+    seen = set()
+    for section in body:
+        if not isinstance(section, list) or not section:
+            continue
+        key = section[0]
+        if key == ":types":
+            for child, parent in parse_typed_list(section[1:]):
+                if child != "object":
+                    domain["types"][child] = parent
+        elif key == ":predicates":
+            for pred in section[1:]:
+                domain["predicates"][pred[0]] = len(parse_typed_list(pred[1:]))
+        elif key == ":action":
+            action = _action(section)
+            # duplicated templates (e.g. MAKE + COOK) keep the first definition
+            if action["name"] not in seen:
+                seen.add(action["name"])
+                domain["actions"].append(action)
+    return domain
+
+
+def parse_problem(text):
+    """
+    Salida: dict {name, domain, objects, init, goal}
+    objects es un mapa objeto -> lista de tipos (el generador a veces
+    declara el mismo nombre como object y como location).
+    """
+    name, body = _sections(parse_sexpr(text), "problem")
+    problem = {"name": name, "domain": None, "objects": {}, "init": [], "goal": []}
+    for section in body:
+        if not isinstance(section, list) or not section:
+            continue
+        key = section[0]
+        if key == ":domain":
+            problem["domain"] = section[1]
+        elif key == ":objects":
+            for obj, typ in parse_typed_list(section[1:]):
+                types = problem["objects"].setdefault(obj, [])
+                if typ not in types:
+                    types.append(typ)
+        elif key == ":init":
+            problem["init"] = [_atom(a) for a in section[1:]]
+        elif key == ":goal":
+            problem["goal"] = parse_condition(section[1] if len(section) > 1 else [])
+    return problem
+
+
+def format_atom(atom):
+    return "(" + " ".join(atom) + ")"
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from pddl_parser import parse_domain, parse_problem
+
+# -------------------------
+# Forma canónica de un par (domain, problem)
+# -------------------------
+# Dos pares que solo difieren en espacios, mayúsculas, comentarios, nombres
+# de problem o en el orden de objetos / init / metas / acciones producen la
+# misma clave. Con ordered=True (planner.solve(ordered=True)) el orden de las
+# metas sí cuenta y forma parte de la clave.
+
+KEY_VERSION = "v1"
+
+
+def canonical_form(domain_text, problem_text, ordered=False):
+    domain = parse_domain(domain_text)
+    problem = parse_problem(problem_text)
+    actions = sorted(
+        [a["name"], a["params"], sorted(a["pre"]), sorted(a["add"]), sorted(a["del"])]
+        for a in domain["actions"]
+    )
+    form = {
+        "types": sorted(domain["types"].items()),
+        "predicates": sorted(domain["predicates"].items()),
+        "actions": actions,
+        "objects": sorted((obj, sorted(types)) for obj, types in problem["objects"].items()),
+        "init": sorted(set(problem["init"])),
+        "goal": sorted(set(problem["goal"])),
+    }
+    if ordered:
+        form["goal_order"] = list(dict.fromkeys(problem["goal"]))
+    return form
+
+
+def canonical_key(domain_text, problem_text, ordered=False):
+    """
+    sha256 de la forma canónica; lanza PDDLParseError si el PDDL es inválido.
+    """
+    canon = json.dumps(canonical_form(domain_text, problem_text, ordered), separators=(",", ":"))
+    return hashlib.sha256((KEY_VERSION + canon).encode("utf-8")).hexdigest()
+
+
+# -------------------------
+# Almacén persistente (SQLite)
+# -------------------------
+class PlanCache:
+    """
+    Planes por clave canónica en SQLite (WAL + busy_timeout, así varios
+    procesos worker pueden compartir el fichero). Expulsa por último acceso
+    cuando el total supera max_bytes.
+    """
+
+    # refresh 'accessed' at most this often per entry, to keep reads read-only
+    TOUCH_INTERVAL = 60.0
+    # raw (domain, problem) digest -> canonical key, skips re-parsing on exact repeats
+    KEY_MEMO_SIZE = 4096
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " key TEXT PRIMARY KEY, result TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS plans_accessed ON plans(accessed)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def key(self, domain_text, problem_text, ordered=False):
+        raw = hashlib.sha1(domain_text.encode("utf-8") + b"\0" + problem_text.encode("utf-8")).digest()
+        if ordered:
+            raw += b"o"
+        with self._memo_lock:
+            key = self._memo.get(raw)
+            if key is not None:
+                self._memo.move_to_end(raw)
+                return key
+        key = canonical_key(domain_text, problem_text, ordered)
+        with self._memo_lock:
+            self._memo[raw] = key
+            if len(self._memo) > self.KEY_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return key
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT result, accessed FROM plans WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > self.TOUCH_INTERVAL:
+            conn.execute("UPDATE plans SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        data = json.dumps(result, separators=(",", ":"))
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (key, result, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM plans").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total - self.max_bytes)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, excess):
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM plans ORDER BY accessed"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM plans WHERE key = ?", doomed)
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM plans WHERE key = ?", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM plans")
+        with self._memo_lock:
+            self._memo.clear()
+
+    def stats(self):
+        count, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
@@ -0,0 +1,282 @@
+import heapq
+import itertools
+import sys
+import time
+
+from grounding import BudgetExceeded, applicable, bits, decode, ground
+from pddl_parser import format_atom, parse_domain, parse_problem
+from simplify import impossible_goals, prune, relevant_parameters, relevant_schemas, unreachable_goals, used_objects
+
+# -------------------------
+# Planificador STRIPS local
+# -------------------------
+# Sustituye la llamada a solver.planning.domains: parsea domain/problem,
+# simplifica (simplify.py), instancia (grounding) las acciones y busca con
+# greedy best-first + h_FF.
+
+PLANNER_NAME = "local-gbfs-ff"
+DEFAULT_TIMEOUT = 10.0
+PROGRESS_EVERY = 64  # expansions between budget checks / progress callbacks
+STATE_OVERHEAD = 120  # approx. bytes per stored state besides the int itself (dict slot, parent tuple, heap entry)
+
+
+# -------------------------
+# Heurística (relajación sin deletes: h_add -> plan relajado / h_FF)
+# -------------------------
+def relaxed_plan(task, state):
+    """
+    Calcula h_add con mejores soportes y extrae el plan relajado.
+    Salida: (h, preferred) con h = tamaño del plan relajado (h_FF) o None si
+    alguna meta es inalcanzable, y preferred = acciones del plan relajado
+    aplicables en state (helpful actions).
+    """
+    goal_bits = bits(task["goal"] & ~state)
+    if not goal_bits:
+        return 0, ()
+    remaining = len(goal_bits)
+    goal = set(goal_bits)
+    n = len(task["atoms"])
+    cost = [None] * n
+    support = [None] * n
+    unsatisfied = list(task["pre_count"])
+    acc = [0] * len(unsatisfied)
+    add_ids = task["add_ids"]
+    pre_index = task["pre_index"]
+    heap = [(0, i, -1) for i in bits(state)]
+    for i in task["always"]:
+        heap.extend((1, atom, i) for atom in add_ids[i])
+    heapq.heapify(heap)
+    while heap and remaining:
+        c, atom, via = heapq.heappop(heap)
+        if cost[atom] is not None:
+            continue
+        cost[atom] = c
+        support[atom] = via
+        if atom in goal:
+            remaining -= 1
+        for i in pre_index[atom]:
+            unsatisfied[i] -= 1
+            acc[i] += c
+            if unsatisfied[i] == 0:
+                for add in add_ids[i]:
+                    if cost[add] is None:
+                        heapq.heappush(heap, (acc[i] + 1, add, i))
+    if remaining:
+        return None, ()
+
+    actions = task["actions"]
+    chosen = set()
+    stack = goal_bits
+    while stack:
+        atom = stack.pop()
+        via = support[atom]
+        if via < 0 or via in chosen:
+            continue
+        chosen.add(via)
+        stack.extend(bits(actions[via][1] & ~state))
+    preferred = [i for i in chosen if state & actions[i][1] == actions[i][1]]
+    return len(chosen), preferred
+
+
+# -------------------------
+# Búsqueda greedy best-first
+# -------------------------
+def search(task, deadline=None, cancel=None, max_bytes=None, on_progress=None):
+    """
+    Salida: (plan, stats) con plan = lista de nombres de acción o None.
+    Los estados son bitsets (int); ver grounding.py. La heurística se evalúa
+    al expandir (evaluación diferida): los hijos entran en la cola con el h
+    del padre y las helpful actions van primero en caso de empate.
+    Presupuestos cooperativos: deadline (perf_counter), cancel (Event),
+    max_bytes (memoria aproximada de los estados guardados). Si se corta,
+    stats["stopped"] dice por qué. on_progress(stats) se llama cada
+    PROGRESS_EVERY expansiones.
+    """
+    actions = task["actions"]
+    goal = task["goal"]
+    init = task["init"]
+    stats = {"expanded": 0, "generated": 1, "best_h": None, "bytes": 0, "stopped": None}
+
+    tie = itertools.count()
+    open_list = [(0, 0, 0, next(tie), init, None)]
+    parent = {}
+    while open_list:
+        _, _, g, _, state, via = heapq.heappop(open_list)
+        if state in parent:
+            continue
+        parent[state] = via
+        if state & goal == goal:
+            plan = []
+            while parent[state] is not None:
+                state, i = parent[state]
+                plan.append(actions[i][0])
+            plan.reverse()
+            return plan, stats
+        if stats["expanded"] % PROGRESS_EVERY == 0:
+            if deadline is not None and time.perf_counter() > deadline:
+                stats["stopped"] = "timeout"
+            elif cancel is not None and cancel.is_set():
+                stats["stopped"] = "cancelled"
+            elif max_bytes is not None and stats["bytes"] > max_bytes:
+                stats["stopped"] = "memory"
+            if stats["stopped"]:
+                return None, stats
+            if on_progress is not None:
+                on_progress(stats)
+        h, preferred = relaxed_plan(task, state)
+        if h is None:
+            continue
+        stats["expanded"] += 1
+        if stats["best_h"] is None or h < stats["best_h"]:
+            stats["best_h"] = h
+        preferred = set(preferred)
+        for i in applicable(task, state):
+            _, _, add, delete = actions[i]
+            succ = (state & ~delete) | add
+            if succ in parent:
+                continue
+            stats["generated"] += 1
+            stats["bytes"] += sys.getsizeof(succ) + STATE_OVERHEAD
+            rank = 0 if i in preferred else 1
+            heapq.heappush(open_list, (h, rank, g + 1, next(tie), succ, (state, i)))
+    return None, stats
+
+
+# -------------------------
+# Submetas ordenadas (un paso de la instrucción tras otro)
+# -------------------------
+def search_ordered(task, goals, deadline=None, cancel=None, max_bytes=None, on_progress=None):
+    """
+    goals: máscaras de meta en orden. Busca la etapa k desde el estado en
+    que terminó la k-1, exigiendo solo la meta k, y concatena los planes.
+    Las metas anteriores se cumplieron en su momento y no tienen por qué
+    mantenerse ("recoger la llave y luego dejarla en la mesa" no exige
+    seguir teniéndola, la conjunción plana sí). Cada búsqueda es pequeña,
+    así que el coste crece con el número de pasos y no con el espacio
+    conjunto.
+    max_bytes se aplica por etapa (los estados de la anterior se liberan).
+    Salida: como search, con stats["stages"] y stats["failed_stage"].
+    """
+    actions = task["actions"]
+    by_name = {a[0]: i for i, a in enumerate(actions)}
+    totals = {"expanded": 0, "generated": 1, "best_h": None, "bytes": 0, "stopped": None,
+              "stages": len(goals), "failed_stage": None}
+
+    def progress(stats):
+        if on_progress is not None:
+            on_progress(dict(totals, expanded=totals["expanded"] + stats["expanded"], best_h=stats["best_h"]))
+
+    state = task["init"]
+    plan = []
+    for k, goal in enumerate(goals):
+        if state & goal == goal:
+            continue
+        sub, stats = search(dict(task, init=state, goal=goal), deadline, cancel, max_bytes, progress)
+        totals["expanded"] += stats["expanded"]
+        totals["generated"] += stats["generated"]
+        totals["bytes"] = max(totals["bytes"], stats["bytes"])
+        totals["best_h"] = stats["best_h"]
+        if sub is None:
+            totals["stopped"] = stats["stopped"]
+            totals["failed_stage"] = k
+            return None, totals
+        for name in sub:
+            _, _, add, delete = actions[by_name[name]]
+            state = (state & ~delete) | add
+        plan.extend(sub)
+    return plan, totals
+
+
+# -------------------------
+# API: mismo formato JSON que devolvía solver.planning.domains
+# -------------------------
+STOP_ERRORS = {
+    "timeout": "search timed out",
+    "cancelled": "search cancelled",
+    "memory": "memory budget exceeded",
+}
+# errors that depend on budgets/load rather than on the problem itself (not cacheable)
+TRANSIENT_ERRORS = frozenset(STOP_ERRORS.values())
+UNREACHABLE_ERROR = "goal unreachable"
+NO_PLAN_ERROR = "no plan found"
+# errors that only depend on the problem: the same input always gives them
+DETERMINISTIC_ERRORS = frozenset([UNREACHABLE_ERROR, NO_PLAN_ERROR])
+
+
+def solve(domain_text, problem_text, timeout=DEFAULT_TIMEOUT, cancel=None, max_bytes=None, on_progress=None,
+          ordered=False):
+    """
+    Entrada: textos PDDL (domain, problem) y presupuestos opcionales (ver search)
+    El deadline cuenta desde la llamada y, como cancel y max_bytes, se
+    aplica también al grounding y a la poda; result.stopped_in dice en qué
+    fase se cortó ("grounding" o "search").
+    Con ordered=True cada átomo de la meta, en el orden en que aparece, es
+    una submeta que basta cumplir en su turno (ver search_ordered); si así
+    no hay plan se busca la meta completa de una vez.
+    Salida: dict {status, result}; lanza PDDLParseError si el PDDL es inválido.
+    """
+    start = time.perf_counter()
+    deadline = start + timeout if timeout else None
+    domain = parse_domain(domain_text)
+    problem = parse_problem(problem_text)
+    result = {"planner": PLANNER_NAME}
+
+    def fail(unreachable):
+        # impossible before any search: deterministic, so callers may cache it
+        result.update(ground_actions=0, atoms=0, expanded=0, generated=0,
+                      time=round(time.perf_counter() - start, 6),
+                      error=UNREACHABLE_ERROR, unreachable_goals=unreachable)
+        return {"status": "error", "result": result}
+
+    unreachable = impossible_goals(domain, problem)
+    if unreachable:
+        return fail(unreachable)
+    domain, dropped = relevant_schemas(domain, problem)
+    try:
+        task = ground(domain, problem, relevant_parameters(domain, problem), deadline, cancel, max_bytes)
+        unreachable = unreachable_goals(task)
+        if unreachable:
+            return fail(unreachable)
+        task, pruned = prune(task, deadline, cancel)
+    except BudgetExceeded as e:
+        result.update(ground_actions=None, atoms=None, expanded=0, generated=0,
+                      time=round(time.perf_counter() - start, 6),
+                      error=STOP_ERRORS[e.reason], stopped_in="grounding")
+        return {"status": "error", "result": result}
+    pruned["schemas"] = len(dropped)
+    pruned["objects"] = len(set(problem["objects"]) - used_objects(task))
+    if ordered:
+        index = task["index"]
+        goals = [1 << index[g] for g in dict.fromkeys(problem["goal"])]
+        plan, stats = search_ordered(task, goals, deadline, cancel=cancel, max_bytes=max_bytes, on_progress=on_progress)
+        result["ordered"] = {"stages": stats["stages"], "fallback": False}
+        if plan is None and not stats["stopped"]:
+            # committing to one subgoal at a time can dead-end; the joint search cannot
+            expanded, generated = stats["expanded"], stats["generated"]
+            plan, stats = search(task, deadline, cancel=cancel, max_bytes=max_bytes, on_progress=on_progress)
+            stats["expanded"] += expanded
+            stats["generated"] += generated
+            result["ordered"]["fallback"] = True
+    else:
+        plan, stats = search(task, deadline, cancel=cancel, max_bytes=max_bytes, on_progress=on_progress)
+    result.update({
+        "ground_actions": len(task["actions"]),
+        "atoms": len(task["atoms"]),
+        "pruned": pruned,
+        "expanded": stats["expanded"],
+        "generated": stats["generated"],
+        "time": round(time.perf_counter() - start, 6),
+    })
+    if plan is None:
+        if stats["stopped"]:
+            result["error"] = STOP_ERRORS[stats["stopped"]]
+            result["stopped_in"] = "search"
+        else:
+            result["error"] = NO_PLAN_ERROR
+            open_goals = task["goal"] & ~task["init"]
+            result["open_goals"] = [format_atom(g) for g in sorted(decode(task, open_goals))]
+        return {"status": "error", "result": result}
+    result["plan"] = [{"name": name} for name in plan]
+    result["length"] = len(plan)
+    result["cost"] = len(plan)
+    return {"status": "ok", "result": result}
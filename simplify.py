@@ -0,0 +1,208 @@
+from grounding import CHECK_EVERY, bits, build_tables, check_budget
+from pddl_parser import format_atom
+
+# -------------------------
+# Simplificación previa a la búsqueda
+# -------------------------
+# Dos niveles, ambos seguros para STRIPS (no eliminan ningún plan):
+#   esquemas  antes del grounding, por predicados: se descartan las acciones
+#             sin efectos y las que no pueden contribuir a ninguna meta
+#             (relevancia hacia atrás desde los predicados de la meta). Si un
+#             predicado de la meta no aparece en init ni lo añade ninguna
+#             acción, la meta es imposible y no hace falta instanciar nada.
+#             Después, la misma relevancia sobre los argumentos acota qué
+#             objetos puede tomar cada parámetro, para no instanciar
+#             acciones que solo producen átomos que nadie necesita.
+#   ground    tras el grounding (que ya solo instancia lo alcanzable desde
+#             init): metas no alcanzables en la relajación y relevancia hacia
+#             atrás sobre átomos; las acciones y átomos irrelevantes se quitan
+#             y los bitsets se renumeran.
+
+
+def relevant_schemas(domain, problem):
+    """
+    Salida: (domain con solo las acciones relevantes, nombres descartados).
+    """
+    relevant = {goal[0] for goal in problem["goal"]}
+    kept = []
+    pending = list(domain["actions"])  # actions without add effects are never kept
+    changed = True
+    while changed:
+        changed = False
+        for action in list(pending):
+            if any(atom[0] in relevant for atom in action["add"]):
+                kept.append(action)
+                pending.remove(action)
+                relevant.update(atom[0] for atom in action["pre"])
+                changed = True
+    names = {a["name"] for a in kept}
+    dropped = [a["name"] for a in domain["actions"] if a["name"] not in names]
+    # keep the original order so grounding (and thus plans) stay deterministic
+    return dict(domain, actions=[a for a in domain["actions"] if a["name"] in names]), dropped
+
+
+def relevant_parameters(domain, problem):
+    """
+    Relevancia hacia atrás sobre argumentos, antes del grounding. Para cada
+    predicado y posición se guarda el conjunto de valores que alguna meta o
+    precondición relevante puede pedir (None: cualquiera); una acción solo
+    es relevante si alguno de sus add casa con esos conjuntos, y cada
+    parámetro queda limitado a los valores con que casa.
+    Salida: lista paralela a domain["actions"]; por acción, None si no es
+    relevante o {parámetro: conjunto de objetos} con los parámetros
+    acotados (los que faltan, sin límite).
+    """
+    relevant = {}
+
+    def need(pred, pos_values):
+        slots = relevant.setdefault(pred, [set() for _ in pos_values])
+        if len(slots) != len(pos_values):
+            return False
+        changed = False
+        for k, values in enumerate(pos_values):
+            if slots[k] is None:
+                continue
+            if values is None:
+                slots[k] = None
+                changed = True
+            elif not values <= slots[k]:
+                slots[k] |= values
+                changed = True
+        return changed
+
+    for goal in problem["goal"]:
+        need(goal[0], [{x} for x in goal[1:]])
+
+    actions = domain["actions"]
+    out = [None] * len(actions)
+    changed = True
+    while changed:
+        changed = False
+        for i, action in enumerate(actions):
+            params = {v for v, _ in action["params"]}
+            limits = None
+            for atom in action["add"]:
+                slots = relevant.get(atom[0])
+                if slots is None or len(slots) != len(atom) - 1:
+                    continue
+                bound = {}
+                for term, values in zip(atom[1:], slots):
+                    if values is None:
+                        continue
+                    if term not in params:
+                        if term not in values:
+                            break
+                    elif term in bound:
+                        bound[term] = bound[term] & values
+                    else:
+                        bound[term] = set(values)
+                else:
+                    # params this atom leaves open can take any value
+                    if limits is None:
+                        limits = bound
+                    else:
+                        limits = {v: limits[v] | bound[v] for v in limits if v in bound}
+            if limits is None:
+                continue
+            out[i] = limits
+            for atom in action["pre"]:
+                pos_values = [limits.get(x) if x in params else {x} for x in atom[1:]]
+                if need(atom[0], pos_values):
+                    changed = True
+    return out
+
+
+def impossible_goals(domain, problem):
+    """
+    Metas cuyo predicado nadie produce. Salida: lista de {goal, reason}.
+    """
+    produced = {fact[0] for fact in problem["init"]}
+    for action in domain["actions"]:
+        produced.update(atom[0] for atom in action["add"])
+    init = set(problem["init"])
+    out = []
+    for goal in dict.fromkeys(problem["goal"]):
+        if goal in init or goal[0] in produced:
+            continue
+        if goal[0] not in domain["predicates"]:
+            reason = f"predicate '{goal[0]}' is not declared in the domain"
+        else:
+            reason = f"no action adds '{goal[0]}' and it is not in :init"
+        out.append({"goal": format_atom(goal), "reason": reason})
+    return out
+
+
+def unreachable_goals(task):
+    """
+    Metas ground que ninguna acción alcanzable añade y no están en init.
+    """
+    reachable = task["init"]
+    for _, _, add, _ in task["actions"]:
+        reachable |= add
+    missing = task["goal"] & ~reachable
+    return [
+        {"goal": format_atom(task["atoms"][i]), "reason": "no reachable action adds it"}
+        for i in bits(missing)
+    ]
+
+
+def prune(task, deadline=None, cancel=None):
+    """
+    Relevancia hacia atrás desde la meta sobre la tarea ground.
+    Salida: (tarea nueva con tablas, stats {actions, atoms} eliminados).
+    Lanza grounding.BudgetExceeded si se pasa el deadline o se cancela.
+    """
+    actions = task["actions"]
+    adders = {}
+    for i, (_, _, add, _) in enumerate(actions):
+        if i % CHECK_EVERY == 0:
+            check_budget(deadline, cancel)
+        for b in bits(add):
+            adders.setdefault(b, []).append(i)
+    relevant = task["goal"]
+    keep = set()
+    stack = bits(relevant)
+    while stack:
+        atom = stack.pop()
+        for i in adders.get(atom, ()):
+            if i in keep:
+                continue
+            keep.add(i)
+            new = actions[i][1] & ~relevant
+            relevant |= new
+            stack.extend(bits(new))
+
+    old_atoms = task["atoms"]
+    atoms = [old_atoms[i] for i in bits(relevant)]
+    remap = {old: new for new, old in enumerate(bits(relevant))}
+
+    def project(mask):
+        m = 0
+        for b in bits(mask & relevant):
+            m |= 1 << remap[b]
+        return m
+
+    kept = []
+    for i, (name, pre, add, delete) in enumerate(actions):
+        if i % CHECK_EVERY == 0:
+            check_budget(deadline, cancel)
+        if i in keep:
+            kept.append((name, project(pre), project(add), project(delete)))
+    new_task = build_tables({
+        "atoms": atoms,
+        "index": {atom: i for i, atom in enumerate(atoms)},
+        "init": project(task["init"]),
+        "goal": project(task["goal"]),
+        "actions": kept,
+    })
+    return new_task, {"actions": len(actions) - len(kept), "atoms": len(old_atoms) - len(atoms)}
+
+
+def used_objects(task):
+    """
+    Objetos que aparecen en algún átomo o acción ground de task.
+    """
+    used = {arg for atom in task["atoms"] for arg in atom[1:]}
+    for name, _, _, _ in task["actions"]:
+        used.update(name[1:-1].split()[1:])
+    return used
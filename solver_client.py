@@ -0,0 +1,306 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import planner
+
+# -------------------------
+# Backends de resolución
+# -------------------------
+# Todos tienen solve(domain, problem, deadline, cancel, max_bytes,
+# on_progress, ordered) y devuelven el formato de planner.solve
+# ({status, result}). deadline es absoluto (time.monotonic()): cada intento,
+# espera y reintento descuenta del mismo presupuesto, y el backend HTTP
+# propaga al servidor en X-Solve-Timeout lo que le queda a cada intento.
+#   local  planner.solve en el proceso
+#   http   API de solver.planning.domains (POST {domain, problem}); sesión
+#          con pool de conexiones keep-alive, concurrencia acotada y
+#          reintentos con backoff exponencial y jitter
+# SolverClient pone un circuit breaker delante del backend principal y, si
+# está abierto o el backend falla, resuelve con el de respaldo (local), que
+# tiene reservada una parte del presupuesto.
+
+UNAVAILABLE_ERROR = "solver unavailable"
+# they depend on budgets or on the backend, not on the problem
+TRANSIENT_ERRORS = planner.TRANSIENT_ERRORS | {UNAVAILABLE_ERROR}
+RETRY_STATUS = frozenset([429, 500, 502, 503, 504])
+ATTEMPT_TIMEOUT = 10.0  # seconds, cap for a single HTTP attempt
+FALLBACK_BUDGET = 1.0  # seconds of the solve budget kept for the fallback backend
+
+BACKEND_SECONDS = metrics.histogram(
+    "solver_backend_seconds", "Time per solve call, by backend and outcome.", ["backend", "outcome"])
+RETRIES = metrics.counter("solver_backend_retries_total", "Retried backend attempts.", ["backend", "reason"])
+FAILOVERS = metrics.counter("solver_failovers_total", "Solves sent to the fallback backend.", ["reason"])
+
+
+class BackendError(Exception):
+    """
+    Fallo transitorio del backend (red, timeout, 5xx) tras agotar reintentos.
+    """
+
+
+def _remaining(deadline):
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def cacheable(result):
+    """
+    True si result se puede guardar para siempre: un plan, o un error
+    determinista del planificador local (meta inalcanzable, espacio
+    agotado). Los errores de un backend remoto (su timeout, memoria o
+    sobrecarga) dependen de él y no del problema.
+    """
+    if result["status"] == "ok":
+        return True
+    res = result["result"]
+    return res.get("backend", "local") == "local" and res.get("error") in planner.DETERMINISTIC_ERRORS
+
+
+def _cancelled():
+    return {"status": "error", "result": {"error": planner.STOP_ERRORS["cancelled"]}}
+
+
+class LocalBackend:
+    name = "local"
+
+    def solve(self, domain, problem, deadline=None, cancel=None, max_bytes=None, on_progress=None, ordered=False):
+        timeout = _remaining(deadline)
+        if timeout is not None:
+            # planner.solve treats 0 as "no limit"
+            timeout = max(timeout, 0.001)
+        return planner.solve(domain, problem, timeout=timeout, cancel=cancel, max_bytes=max_bytes,
+                             on_progress=on_progress, ordered=ordered)
+
+
+class HTTPBackend:
+    """
+    Cliente de la API de solver.planning.domains (o de solver_server.py).
+    max_in_flight acota las peticiones simultáneas de todo el proceso; una
+    petición que no consigue turno antes de su deadline falla sin llamar.
+    Cada intento dura como mucho attempt_timeout segundos, para que un
+    remoto lento no se lleve todo el presupuesto en un solo intento.
+    """
+
+    name = "http"
+
+    def __init__(self, url, pool_size=8, max_in_flight=8, retries=2, backoff=0.1, max_backoff=2.0,
+                 connect_timeout=3.05, attempt_timeout=ATTEMPT_TIMEOUT):
+        self.url = url
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+    def solve(self, domain, problem, deadline=None, cancel=None, max_bytes=None, on_progress=None, ordered=False):
+        payload = {"domain": domain, "problem": problem}
+        if ordered:
+            payload["ordered"] = True
+        attempt = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                return _cancelled()
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                raise BackendError("deadline exceeded")
+            result, error, retry_after = self._attempt(payload, remaining)
+            if error is None:
+                return result
+            if attempt >= self.retries:
+                raise BackendError(error)
+            attempt += 1
+            RETRIES.inc(backend=self.name, reason=error.split(":")[0])
+            # full jitter: uniform in [0, min(cap, base * 2^attempt)]
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            delay = max(delay, retry_after or 0)
+            remaining = _remaining(deadline)
+            if remaining is not None and delay >= remaining:
+                raise BackendError(f"{error} (no time left to retry)")
+            if cancel is not None:
+                if cancel.wait(delay):
+                    return _cancelled()
+            else:
+                time.sleep(delay)
+
+    def _attempt(self, payload, remaining):
+        """
+        Un intento. Salida: (resultado, None, None) o (None, error, retry_after).
+        """
+        timeout = self.attempt_timeout if remaining is None else min(remaining, self.attempt_timeout)
+        if not self._slots.acquire(timeout=timeout):
+            return None, "too many requests in flight", None
+        try:
+            resp = self.session.post(
+                self.url, json=payload,
+                timeout=(min(self.connect_timeout, timeout), timeout),
+                headers={"X-Solve-Timeout": "%.3f" % timeout},
+            )
+        except requests.Timeout:
+            return None, "timeout", None
+        except requests.RequestException as e:
+            return None, f"connection: {e}", None
+        finally:
+            self._slots.release()
+        if resp.status_code in RETRY_STATUS:
+            retry_after = resp.headers.get("Retry-After")
+            return None, f"HTTP {resp.status_code}", float(retry_after) if retry_after and retry_after.isdigit() else None
+        try:
+            data = resp.json()
+        except ValueError:
+            return None, "malformed: response is not JSON", None
+        if resp.status_code >= 400:
+            # the solver rejected this problem: deterministic, do not retry
+            detail = data.get("result") if isinstance(data, dict) else data
+            return {"status": "error", "result": {"error": f"solver rejected the problem (HTTP {resp.status_code})",
+                                                  "detail": detail, "backend": self.name}}, None, None
+        if not isinstance(data, dict) or "status" not in data:
+            return None, "malformed: missing status", None
+        result = data.get("result")
+        if not isinstance(result, dict):
+            # planning.domains reports errors as a bare string
+            result = {"error": str(result)}
+        # tagged here too, so nothing downstream mistakes a remote error for a local one
+        result["backend"] = self.name
+        return {"status": data["status"], "result": result}, None, None
+
+
+# -------------------------
+# Circuit breaker
+# -------------------------
+class CircuitBreaker:
+    """
+    closed: todo pasa; tras `failures` fallos seguidos se abre. open: nada
+    pasa durante reset_timeout segundos. half_open: pasa una sola petición
+    de prueba; si va bien se cierra, si falla se vuelve a abrir.
+    """
+
+    def __init__(self, failures=5, reset_timeout=30.0):
+        self.max_failures = failures
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+                return True
+            return self.state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.max_failures:
+                if self.state != "open":
+                    logging.warning("Solver circuit opened after %d failures", self.failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+# -------------------------
+# Cliente
+# -------------------------
+class SolverClient:
+    """
+    solve() con la firma de planner.solve (timeout relativo, en segundos).
+    El resultado indica en result.backend quién lo resolvió y, si hubo
+    failover, el motivo en result.failover. Con respaldo, el principal
+    termina fallback_budget segundos antes del deadline (como mucho la
+    mitad del presupuesto) y el respaldo tiene al menos ese tiempo.
+    """
+
+    def __init__(self, primary, fallback=None, breaker=None, fallback_budget=FALLBACK_BUDGET):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker
+        self.fallback_budget = fallback_budget
+
+    def solve(self, domain, problem, timeout=None, cancel=None, max_bytes=None, on_progress=None, ordered=False):
+        deadline = time.monotonic() + timeout if timeout else None
+        primary_deadline = deadline
+        if deadline is not None and self.fallback is not None:
+            primary_deadline = deadline - min(self.fallback_budget, timeout / 2)
+        kwargs = dict(cancel=cancel, max_bytes=max_bytes, on_progress=on_progress, ordered=ordered)
+        if self.breaker is None or self.breaker.allow():
+            started = time.perf_counter()
+            try:
+                result = self.primary.solve(domain, problem, deadline=primary_deadline, **kwargs)
+                result["result"]["backend"] = self.primary.name
+            except Exception as e:
+                # anything but a result counts against the breaker, or a failed probe would keep it half open
+                BACKEND_SECONDS.observe(time.perf_counter() - started, backend=self.primary.name, outcome="error")
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                if isinstance(e, BackendError):
+                    reason = str(e)
+                    logging.warning("Solver backend %s failed: %s", self.primary.name, reason)
+                else:
+                    reason = f"{type(e).__name__}: {e}"
+                    logging.exception("Solver backend %s raised", self.primary.name)
+            else:
+                BACKEND_SECONDS.observe(time.perf_counter() - started, backend=self.primary.name, outcome="ok")
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return result
+        else:
+            reason = "circuit open"
+        if self.fallback is None:
+            return {"status": "error", "result": {"error": UNAVAILABLE_ERROR, "detail": reason,
+                                                  "backend": self.primary.name}}
+        FAILOVERS.inc(reason="circuit_open" if reason == "circuit open" else "error")
+        if deadline is not None:
+            deadline = max(deadline, time.monotonic() + min(self.fallback_budget, timeout / 2))
+        started = time.perf_counter()
+        result = self.fallback.solve(domain, problem, deadline=deadline, **kwargs)
+        BACKEND_SECONDS.observe(time.perf_counter() - started, backend=self.fallback.name, outcome="ok")
+        result["result"].update(backend=self.fallback.name, failover=reason)
+        return result
+
+    def stats(self):
+        out = {"backend": self.primary.name, "fallback": self.fallback.name if self.fallback else None}
+        if self.breaker is not None:
+            out.update(circuit=self.breaker.state, failures=self.breaker.failures)
+        return out
+
+
+def make_client(backend="local", url=None, pool_size=8, max_in_flight=8, retries=2, backoff=0.1,
+                attempt_timeout=ATTEMPT_TIMEOUT, breaker_failures=5, breaker_reset=30.0, failover=True,
+                fallback_budget=FALLBACK_BUDGET):
+    """
+    SolverClient a partir de la configuración del servidor (ver app.py).
+    """
+    if backend == "local":
+        return SolverClient(LocalBackend())
+    if backend != "http":
+        raise ValueError(f"unknown solver backend {backend!r} (expected 'local' or 'http')")
+    if not url:
+        raise ValueError("the http solver backend needs a url")
+    primary = HTTPBackend(url, pool_size=pool_size, max_in_flight=max_in_flight, retries=retries, backoff=backoff,
+                          attempt_timeout=attempt_timeout)
+    return SolverClient(primary, LocalBackend() if failover else None,
+                        CircuitBreaker(breaker_failures, breaker_reset), fallback_budget=fallback_budget)
@@ -0,0 +1,117 @@
+"""
+Servidor local con la API de solver.planning.domains, para probar y medir
+todo el camino de /solve sin red (FLASK_SOLVER_BACKEND=http).
+
+    python solver_server.py [--port 8001] [--timeout 10] [--delay 0.05] [--fail-rate 0.1]
+
+POST /solve con {domain, problem[, ordered]} responde {status, result} como
+planner.solve. Respeta X-Solve-Timeout (segundos que le quedan al cliente).
+--delay añade latencia y --fail-rate responde 503 a esa fracción de
+peticiones, para ejercitar reintentos y el circuit breaker. Solo usa la
+biblioteca estándar (sin Flask); conexiones keep-alive (HTTP/1.1).
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import planner
+from pddl_parser import PDDLParseError
+
+
+class SolveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; with Nagle on, keep-alive
+    # responses stall ~40 ms waiting for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up (its deadline passed); nothing left to answer
+            self.close_connection = True
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"status": "error", "result": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        if self.path.rstrip("/") != "/solve":
+            self._reply(404, {"status": "error", "result": "not found"})
+            return
+        opts = self.server.options
+        if opts["fail_rate"] and opts["rng"].random() < opts["fail_rate"]:
+            self._reply(503, {"status": "error", "result": "injected failure"}, [("Retry-After", "0")])
+            return
+        try:
+            data = json.loads(raw)
+            domain, problem = data["domain"], data["problem"]
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {"status": "error", "result": "expected {domain, problem}"})
+            return
+        if opts["delay"]:
+            time.sleep(opts["delay"])
+        timeout = opts["timeout"]
+        try:
+            timeout = min(timeout, float(self.headers.get("X-Solve-Timeout", timeout)))
+        except ValueError:
+            pass
+        try:
+            result = planner.solve(domain, problem, timeout=max(timeout, 0.001), ordered=bool(data.get("ordered")))
+        except PDDLParseError as e:
+            self._reply(400, {"status": "error", "result": f"invalid PDDL: {e}"})
+            return
+        self._reply(200, result)
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host="127.0.0.1", port=8001, timeout=10.0, delay=0.0, fail_rate=0.0, seed=None):
+    """
+    Servidor sin arrancar (serve_forever); port=0 elige un puerto libre
+    (server.server_address).
+    """
+    server = ThreadingHTTPServer((host, port), SolveHandler)
+    server.daemon_threads = True
+    server.options = {"timeout": timeout, "delay": delay, "fail_rate": fail_rate, "rng": random.Random(seed)}
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local con la API de solver.planning.domains.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--timeout", type=float, default=10.0, help="límite de búsqueda por petición (segundos)")
+    parser.add_argument("--delay", type=float, default=0.0, help="latencia añadida por petición (segundos)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fracción de peticiones que responden 503")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    server = make_server(args.host, args.port, args.timeout, args.delay, args.fail_rate, args.seed)
+    print(f"solver stand-in on http://{args.host}:{server.server_address[1]}/solve", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import json
+
+# -------------------------
+# Representación intermedia de un paso
+# -------------------------
+# Un Step no copia subcadenas: guarda una referencia al texto normalizado
+# (compartida por todos los pasos de la instrucción) y offsets en él. El tipo
+# de acción y los nombres de entidad son los objetos str del lexicón y de los
+# matchers, así que pasos iguales comparten las mismas cadenas. Al picklear
+# (caché, pool de procesos) el texto se serializa una sola vez por lista.
+
+_pddl_names = {}  # entity name -> PDDL identifier; names come from the bounded lexicons
+
+
+def pddl_name(name):
+    if name is None:
+        return None
+    ident = _pddl_names.get(name)
+    if ident is None:
+        ident = _pddl_names[name] = name.replace(" ", "_")
+    return ident
+
+
+class Step:
+    __slots__ = ("text", "start", "end", "verb_start", "verb_end", "action", "object", "place", "cond_start")
+
+    def __init__(self, text, start, end, verb_start, verb_end, action, object=None, place=None, cond_start=None):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.verb_start = verb_start
+        self.verb_end = verb_end
+        self.action = action
+        self.object = object
+        self.place = place
+        self.cond_start = cond_start
+
+    @property
+    def raw(self):
+        return self.text[self.start:self.end]
+
+    @property
+    def verb_text(self):
+        return self.text[self.verb_start:self.verb_end]
+
+    @property
+    def condition(self):
+        return None if self.cond_start is None else self.text[self.cond_start:self.end]
+
+    @property
+    def object_id(self):
+        return pddl_name(self.object)
+
+    @property
+    def place_id(self):
+        return pddl_name(self.place)
+
+    def to_dict(self):
+        """
+        Forma pública (la misma que devolvía la API con dicts).
+        """
+        text, end = self.text, self.end
+        return {
+            "raw": text[self.start:end],
+            "verb_text": text[self.verb_start:self.verb_end],
+            "action": self.action,
+            "object": self.object,
+            "place": self.place,
+            "condition": None if self.cond_start is None else text[self.cond_start:end],
+        }
+
+    def __reduce__(self):
+        return (Step, (self.text, self.start, self.end, self.verb_start, self.verb_end,
+                       self.action, self.object, self.place, self.cond_start))
+
+    def __eq__(self, other):
+        return isinstance(other, Step) and self.__reduce__() == other.__reduce__()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Step({self.action} {self.raw!r})"
+
+
+# -------------------------
+# JSON
+# -------------------------
+def json_default(obj):
+    if isinstance(obj, Step):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """
+    json.dumps compacto que entiende Step (meta, SSE, NDJSON); sin escapar
+    los acentos, que en ES son buena parte del texto.
+    """
+    return json.dumps(obj, default=json_default, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,62 @@
+import json
+
+import cli
+
+INSTRUCTIONS = [
+    "recoge la llave de la mesa",
+    {"instruction": "abre la puerta del dormitorio"},
+    "",
+    "enciende la luz y luego limpia la mesa",
+]
+
+
+def write_input(path):
+    with open(path, "w", encoding="utf-8") as fh:
+        for item in INSTRUCTIONS:
+            fh.write((json.dumps(item, ensure_ascii=False) if item else "") + "\n")
+
+
+def read(path):
+    with open(path, encoding="utf-8") as fh:
+        return fh.read()
+
+
+def test_second_run_is_skipped(tmp_path, capsys, monkeypatch):
+    source, out = tmp_path / "in.jsonl", tmp_path / "out"
+    write_input(source)
+    assert cli.main([str(source), "--out", str(out), "--workers", "1"]) == 0
+    index = read(out / cli.INDEX_FILE)
+    assert [row["line"] for row in map(json.loads, index.splitlines())] == [1, 2, 4]
+    capsys.readouterr()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("converted twice")
+
+    monkeypatch.setattr(cli, "generate_many", fail)
+    assert cli.main([str(source), "--out", str(out), "--workers", "1"]) == 0
+    assert "already converted (3 rows)" in capsys.readouterr().err
+    assert read(out / cli.INDEX_FILE) == index
+
+
+def test_resume_from_checkpoint(tmp_path):
+    source, out = tmp_path / "in.jsonl", tmp_path / "out"
+    write_input(source)
+    assert cli.main([str(source), "--out", str(out), "--workers", "1", "--pack"]) == 0
+    index = read(out / cli.INDEX_FILE)
+    pack = read(out / cli.PACK_FILE)
+
+    # as if the run had stopped right after the first row
+    first_row = index.splitlines(keepends=True)[0]
+    first_objects = "".join(pack.splitlines(keepends=True)[:2])  # its domain and problem
+    first_line = json.dumps(INSTRUCTIONS[0], ensure_ascii=False) + "\n"
+    state = json.loads(read(out / cli.CHECKPOINT_FILE))
+    state.update(line=1, offset=len(first_line.encode("utf-8")), rows=1, done=False,
+                 index_size=len(first_row.encode("utf-8")), pack_size=len(first_objects.encode("utf-8")))
+    cli.save_checkpoint(str(out), state)
+    with open(out / cli.INDEX_FILE, "a", encoding="utf-8") as fh:
+        fh.write('{"line": 99, "error": "written after the checkpoint"}\n')
+
+    assert cli.main([str(source), "--out", str(out), "--workers", "1", "--pack"]) == 0
+    assert read(out / cli.INDEX_FILE) == index
+    assert read(out / cli.PACK_FILE) == pack
+    assert json.loads(read(out / cli.CHECKPOINT_FILE))["done"]
@@ -0,0 +1,54 @@
+import random
+
+from incremental import SessionStore, apply_diff
+from pddl_generator import current_lexicon, generate_pddl_from_instruction
+
+STEPS = [
+    "recoge la llave de la mesa",
+    "luego dejala en la cocina",
+    "abre la puerta del dormitorio",
+    "después lleva la manzana a la mesa",
+    "enciende la luz",
+    "y limpia la mesa pero solo después de hervir el agua",
+    "cierra la puerta",
+]
+
+
+def test_incremental_matches_full_generation():
+    lex = current_lexicon()
+    for seed in range(5):
+        rng = random.Random(seed)
+        store = SessionStore()
+        session, revision, domain, problem = None, None, None, None
+        steps = rng.sample(STEPS, 3)
+        for _ in range(12):
+            edit = rng.randrange(3)
+            if edit == 0 or not steps:
+                steps.insert(rng.randrange(len(steps) + 1), rng.choice(STEPS))
+            elif edit == 1:
+                del steps[rng.randrange(len(steps))]
+            else:
+                k = rng.randrange(len(steps))
+                steps[k] = steps[k][:rng.randrange(1, len(steps[k]) + 1)]  # still typing
+            text = ", ".join(steps)
+            out = store.update(session, revision, text, lex)
+            if out["base"] is None:
+                domain, problem = out["domain"], out["problem"]
+            else:
+                domain = apply_diff(domain, out["domain_diff"])
+                problem = apply_diff(problem, out["problem_diff"])
+            session, revision = out["session"], out["revision"]
+            full = generate_pddl_from_instruction(text, lex)
+            assert (domain, problem) == (full["domain"], full["problem"]), (seed, text)
+            assert out["meta"]["actions_present"] == full["meta"]["actions_present"]
+
+
+def test_unchanged_steps_are_reused():
+    lex = current_lexicon()
+    store = SessionStore()
+    first = store.update(None, None, "recoge la llave de la mesa, luego dejala en la cocina", lex)
+    second = store.update(first["session"], first["revision"],
+                          "recoge la llave de la mesa, luego dejala en la cocina, cierra la puerta", lex)
+    assert second["base"] == first["revision"]
+    assert second["steps"]["changed"] == [2]
+    assert second["steps"]["reused"] >= 2
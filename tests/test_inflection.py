@@ -0,0 +1,16 @@
+from inflection import spanish_forms
+from pddl_generator import generate_pddl_from_instruction
+
+
+def test_imperative_clitic_forms():
+    assert {"dejala", "dejalo", "dejalas"} <= set(spanish_forms("dejar"))
+    assert "cierrala" in spanish_forms("cerrar")
+    assert "ponla" in spanish_forms("poner")
+    assert "tomala" in spanish_forms("toma")
+    assert "ve" not in spanish_forms("ir")
+
+
+def test_imperative_clitic_in_instruction():
+    for text in ("recoge la llave y luego dejala en la mesa", "recoge la llave y luego déjala en la mesa"):
+        result = generate_pddl_from_instruction(text)
+        assert [s.action for s in result["meta"]["steps"]] == ["PICK", "PLACE"]
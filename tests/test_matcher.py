@@ -0,0 +1,15 @@
+from matcher import EntityMatcher
+from pddl_generator import generate_pddl_from_instruction
+
+
+def test_underscore_entry_matches_both_spellings():
+    matcher = EntityMatcher(["pieza_dañada", "pieza", "mesa"])
+    assert matcher.find_names("toma la pieza_dañada de la mesa") == ["pieza_dañada", "mesa"]
+    assert matcher.find_names("toma la pieza dañada de la mesa") == ["pieza_dañada", "mesa"]
+    assert matcher.size == 3
+
+
+def test_underscore_entity_in_instruction():
+    result = generate_pddl_from_instruction("El robot toma la pieza_dañada de la mesa")
+    step, = result["meta"]["steps"]
+    assert (step.object, step.place) == ("pieza_dañada", "mesa")
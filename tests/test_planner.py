@@ -0,0 +1,99 @@
+import threading
+
+from pddl_generator import generate_pddl_from_instruction
+from planner import NO_PLAN_ERROR, UNREACHABLE_ERROR, solve
+from validator import validate_result, validate_text
+
+DOMAIN = """
+(define (domain rooms)
+  (:requirements :strips :typing)
+  (:types agent location)
+  (:predicates (at ?a - agent ?l - location) (door ?from - location ?to - location) (visited ?l - location)
+               (free) (used) (lit))
+  (:action move
+    :parameters (?a - agent ?from - location ?to - location)
+    :precondition (and (at ?a ?from) (door ?from ?to))
+    :effect (and (at ?a ?to) (visited ?to) (not (at ?a ?from))))
+  (:action spend
+    :parameters ()
+    :precondition (free)
+    :effect (and (used) (not (free))))
+  (:action light
+    :parameters ()
+    :precondition (free)
+    :effect (and (lit)))
+)
+"""
+
+
+def problem(goal, doors=(("hall", "room"), ("room", "hall"), ("room", "yard")), extra=""):
+    init = " ".join(f"(door {a} {b})" for a, b in doors)
+    return f"""
+(define (problem p) (:domain rooms)
+  (:objects robot - agent hall room yard - location)
+  (:init (at robot hall) {init} {extra})
+  (:goal (and {goal})))
+"""
+
+
+def test_solvable_plan_is_valid():
+    prob = problem("(at robot yard)")
+    result = solve(DOMAIN, prob)
+    assert result["status"] == "ok"
+    plan = [step["name"] for step in result["result"]["plan"]]
+    assert plan == ["(move robot hall room)", "(move robot room yard)"]
+    assert validate_text(DOMAIN, prob, plan) == {"valid": True, "steps": 2}
+
+
+def test_unreachable_goal():
+    result = solve(DOMAIN, problem("(at robot yard)", doors=[("hall", "room")]))
+    assert result["status"] == "error"
+    assert result["result"]["error"] == UNREACHABLE_ERROR
+    assert result["result"]["unreachable_goals"][0]["goal"] == "(at robot yard)"
+
+
+def test_undeclared_goal_predicate_is_unreachable():
+    result = solve(DOMAIN, problem("(flying robot)"))
+    assert result["result"]["error"] == UNREACHABLE_ERROR
+    assert "not declared" in result["result"]["unreachable_goals"][0]["reason"]
+
+
+def test_no_plan():
+    # every goal atom is reachable on its own, but not together
+    result = solve(DOMAIN, problem("(at robot yard) (at robot hall)"))
+    assert result["status"] == "error"
+    assert result["result"]["error"] == NO_PLAN_ERROR
+
+
+def test_ordered_subgoals():
+    prob = problem("(visited room) (visited hall) (at robot yard)")
+    result = solve(DOMAIN, prob, ordered=True)
+    assert result["status"] == "ok"
+    assert result["result"]["ordered"] == {"stages": 3, "fallback": False}
+    assert validate_result(DOMAIN, prob, result, ordered=True)["valid"]
+
+
+def test_ordered_falls_back_to_joint_search():
+    # stage 1 (used) spends (free), which stage 2 (lit) still needs
+    prob = problem("(used) (lit)", extra="(free)")
+    result = solve(DOMAIN, prob, ordered=True)
+    assert result["status"] == "ok"
+    assert result["result"]["ordered"]["fallback"] is True
+    plan = [step["name"] for step in result["result"]["plan"]]
+    assert plan == ["(light)", "(spend)"]
+    assert validate_text(DOMAIN, prob, plan)["valid"]
+
+
+def test_cancelled_before_search():
+    cancel = threading.Event()
+    cancel.set()
+    result = solve(DOMAIN, problem("(at robot yard)"), cancel=cancel)
+    assert result["status"] == "error"
+    assert result["result"]["error"] == "search cancelled"
+
+
+def test_generated_instruction_plan_is_valid():
+    generated = generate_pddl_from_instruction("El agente debe abrir la puerta del dormitorio.")
+    result = solve(generated["domain"], generated["problem"])
+    assert result["status"] == "ok"
+    assert validate_result(generated["domain"], generated["problem"], result)["valid"]
@@ -0,0 +1,110 @@
+import threading
+import time
+
+from solver_client import (UNAVAILABLE_ERROR, BackendError, CircuitBreaker, HTTPBackend, LocalBackend, SolverClient,
+                           cacheable)
+from solver_server import make_server
+from tests.test_planner import DOMAIN, problem
+
+PROBLEM = problem("(at robot yard)")
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def solve(self, domain, problem, deadline=None, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"status": "ok", "result": {"plan": [], "length": 0}}
+
+
+def test_breaker_opens_after_failures():
+    primary = FakeBackend(BackendError("HTTP 503"))
+    client = SolverClient(primary, None, CircuitBreaker(failures=3, reset_timeout=60))
+    for _ in range(3):
+        assert client.solve(DOMAIN, PROBLEM)["result"]["detail"] == "HTTP 503"
+    assert client.breaker.state == "open"
+    result = client.solve(DOMAIN, PROBLEM)
+    assert (result["result"]["error"], result["result"]["detail"]) == (UNAVAILABLE_ERROR, "circuit open")
+    assert primary.calls == 3
+    assert not cacheable(result)
+
+
+def test_every_primary_error_counts():
+    # not only BackendError: a bug or an unexpected exception must open the breaker too
+    primary = FakeBackend(ValueError("bad json"), KeyError("result"), BackendError("timeout"))
+    client = SolverClient(primary, LocalBackend(), CircuitBreaker(failures=3, reset_timeout=60))
+    reasons = [client.solve(DOMAIN, PROBLEM)["result"]["failover"] for _ in range(3)]
+    assert reasons == ["ValueError: bad json", "KeyError: 'result'", "timeout"]
+    assert client.breaker.state == "open"
+    assert client.solve(DOMAIN, PROBLEM)["result"]["failover"] == "circuit open"
+
+
+def test_half_open_probe():
+    breaker = CircuitBreaker(failures=1, reset_timeout=0.05)
+    primary = FakeBackend(BackendError("HTTP 503"), BackendError("HTTP 503"), None)
+    client = SolverClient(primary, None, breaker)
+    client.solve(DOMAIN, PROBLEM)
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    # failed probe: open again for another reset_timeout
+    client.solve(DOMAIN, PROBLEM)
+    assert breaker.state == "open" and primary.calls == 2
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # a single probe at a time
+    breaker.record_success()
+    assert client.solve(DOMAIN, PROBLEM)["status"] == "ok"
+    assert (breaker.state, breaker.failures) == ("closed", 0)
+
+
+def test_failover_to_local():
+    client = SolverClient(FakeBackend(BackendError("HTTP 502")), LocalBackend(), CircuitBreaker(failures=5))
+    result = client.solve(DOMAIN, PROBLEM, timeout=5)
+    assert result["status"] == "ok"
+    assert (result["result"]["backend"], result["result"]["failover"]) == ("local", "HTTP 502")
+    assert result["result"]["length"] == 2
+    assert client.breaker.failures == 1
+
+
+def serve(**options):
+    server = make_server(port=0, seed=1, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d/solve" % server.server_address[1]
+
+
+def test_stand_in_server():
+    server, url = serve()
+    try:
+        client = SolverClient(HTTPBackend(url, retries=0), LocalBackend(), CircuitBreaker(failures=2))
+        result = client.solve(DOMAIN, PROBLEM, timeout=5)
+        assert result["status"] == "ok" and result["result"]["backend"] == "http"
+        assert cacheable(result)
+        unreachable = client.solve(DOMAIN, problem("(at robot yard)", doors=[("hall", "room")]), timeout=5)
+        assert unreachable["result"]["error"] == "goal unreachable"
+        assert not cacheable(unreachable)  # remote errors are never cached
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stand_in_server_failing():
+    server, url = serve(fail_rate=1.0)
+    try:
+        primary = HTTPBackend(url, retries=1, backoff=0.001)
+        client = SolverClient(primary, LocalBackend(), CircuitBreaker(failures=2, reset_timeout=60))
+        for _ in range(2):
+            result = client.solve(DOMAIN, PROBLEM, timeout=5)
+            assert result["status"] == "ok"
+            assert (result["result"]["backend"], result["result"]["failover"]) == ("local", "HTTP 503")
+        assert client.breaker.state == "open"
+        assert client.solve(DOMAIN, PROBLEM, timeout=5)["result"]["failover"] == "circuit open"
+    finally:
+        server.shutdown()
+        server.server_close()
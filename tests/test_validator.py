@@ -0,0 +1,69 @@
+from validator import validate_result, validate_text
+
+DOMAIN = """
+(define (domain kitchen)
+  (:requirements :strips :typing)
+  (:types agent object location)
+  (:predicates (at ?a - agent ?l - location) (in ?o - object ?l - location) (has ?a - agent ?o - object))
+  (:action move
+    :parameters (?a - agent ?from - location ?to - location)
+    :precondition (and (at ?a ?from))
+    :effect (and (at ?a ?to) (not (at ?a ?from))))
+  (:action pick
+    :parameters (?a - agent ?o - object ?l - location)
+    :precondition (and (at ?a ?l) (in ?o ?l))
+    :effect (and (has ?a ?o) (not (in ?o ?l))))
+  (:action place
+    :parameters (?a - agent ?o - object ?l - location)
+    :precondition (and (at ?a ?l) (has ?a ?o))
+    :effect (and (in ?o ?l) (not (has ?a ?o))))
+)
+"""
+
+PROBLEM = """
+(define (problem p) (:domain kitchen)
+  (:objects robot - agent llave - object mesa cocina - location)
+  (:init (at robot mesa) (in llave mesa))
+  (:goal (and (has robot llave) (in llave cocina))))
+"""
+
+PLAN = ["(pick robot llave mesa)", "(move robot mesa cocina)", "(place robot llave cocina)"]
+
+
+def test_valid_plan_ordered():
+    assert validate_text(DOMAIN, PROBLEM, PLAN, ordered=True) == {"valid": True, "steps": 3}
+
+
+def test_flat_goals_must_hold_at_the_end():
+    report = validate_text(DOMAIN, PROBLEM, PLAN)
+    assert not report["valid"]
+    assert report["failed_step"] == 3
+    assert report["unsatisfied"] == ["(has robot llave)"]
+
+
+def test_precondition_not_satisfied():
+    report = validate_text(DOMAIN, PROBLEM, ["(move robot mesa cocina)", "(pick robot llave mesa)"], ordered=True)
+    assert (report["failed_step"], report["reason"]) == (1, "precondition not satisfied")
+    assert report["unsatisfied"] == ["(at robot mesa)"]
+
+
+def test_unknown_action_and_bad_arguments():
+    assert validate_text(DOMAIN, PROBLEM, ["(fly robot cocina)"])["reason"] == "unknown action 'fly'"
+    assert "takes 3 arguments" in validate_text(DOMAIN, PROBLEM, ["(pick robot llave)"])["reason"]
+    report = validate_text(DOMAIN, PROBLEM, ["(pick llave robot mesa)"])
+    assert report["reason"] == "'llave' is not a agent (parameter ?a)"
+
+
+def test_goals_out_of_order():
+    # reversed goal order: (in llave cocina) first, then (has robot llave)
+    reordered = PROBLEM.replace("(has robot llave) (in llave cocina)", "(in llave cocina) (has robot llave)")
+    assert validate_text(DOMAIN, reordered, PLAN + ["(pick robot llave cocina)"], ordered=True)["valid"]
+    report = validate_text(DOMAIN, reordered, PLAN, ordered=True)
+    assert (report["failed_step"], report["reason"]) == (3, "goal 2 of 2 never reached in order")
+    assert report["unsatisfied"] == ["(has robot llave)"]
+
+
+def test_validate_result():
+    ok = {"status": "ok", "result": {"plan": [{"name": name} for name in PLAN]}}
+    assert validate_result(DOMAIN, PROBLEM, ok, ordered=True)["valid"]
+    assert validate_result(DOMAIN, PROBLEM, {"status": "error", "result": {"error": "goal unreachable"}}) is None
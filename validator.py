@@ -0,0 +1,149 @@
+from collections import OrderedDict
+import hashlib
+import threading
+
+from grounding import objects_by_type
+from pddl_parser import format_atom, parse_domain, parse_problem
+
+# -------------------------
+# Validación de planes (simulación STRIPS)
+# -------------------------
+# Comprueba un plan contra el domain/problem que lo originó sin volver a
+# buscar: aplica cada acción ground sobre un conjunto de hechos, verificando
+# tipos y precondiciones, y al final las metas. Coste lineal en la longitud
+# del plan; los textos parseados se memorizan (los dominios generados se
+# repiten mucho), así que es barato ejecutarlo en cada respuesta.
+
+PARSE_MEMO_SIZE = 256
+
+
+class _ParseMemo:
+    def __init__(self, size=PARSE_MEMO_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind, text, parse):
+        key = (kind, hashlib.sha1(text.encode("utf-8")).digest())
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+                return hit
+        value = parse(text)
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return value
+
+
+_memo = _ParseMemo()
+
+
+def _parse_domain(text):
+    domain = parse_domain(text)
+    domain["by_name"] = {a["name"]: a for a in domain["actions"]}
+    return domain
+
+
+def parse_step(name):
+    """
+    "(pick robot llave mesa)" -> ("pick", ("robot", "llave", "mesa"))
+    """
+    parts = name.strip().strip("()").lower().split()
+    if not parts:
+        raise ValueError(f"empty plan step: {name!r}")
+    return parts[0], tuple(parts[1:])
+
+
+def _failure(index, step, reason, unsatisfied=()):
+    return {
+        "valid": False,
+        "failed_step": index,
+        "action": step,
+        "reason": reason,
+        "unsatisfied": [format_atom(a) for a in sorted(unsatisfied)],
+    }
+
+
+def validate(domain, problem, plan, ordered=False):
+    """
+    domain/problem: dicts de pddl_parser; plan: nombres de acción ground.
+    Con ordered=True cada meta debe cumplirse en su turno, en orden (ver
+    planner.search_ordered); si no, todas al final.
+    Salida: {valid, steps} o, en el primer fallo, {valid: False,
+    failed_step (índice, o len(plan) si fallan las metas), action, reason,
+    unsatisfied}.
+    """
+    by_name = domain.get("by_name") or {a["name"]: a for a in domain["actions"]}
+    by_type = problem.get("by_type")
+    if by_type is None:
+        # kept on the problem dict, which validate_text memoizes
+        by_type = problem["by_type"] = {t: set(objs) for t, objs in objects_by_type(domain, problem).items()}
+    state = set(problem["init"])
+    goals = list(dict.fromkeys(problem["goal"]))
+    reached = 0
+
+    def advance(reached):
+        while reached < len(goals) and goals[reached] in state:
+            reached += 1
+        return reached
+
+    if ordered:
+        reached = advance(reached)
+    for index, step in enumerate(plan):
+        try:
+            name, args = parse_step(step)
+        except ValueError as e:
+            return _failure(index, step, str(e))
+        schema = by_name.get(name)
+        if schema is None:
+            return _failure(index, step, f"unknown action '{name}'")
+        params = schema["params"]
+        if len(args) != len(params):
+            return _failure(index, step, f"'{name}' takes {len(params)} arguments, got {len(args)}")
+        for (var, typ), arg in zip(params, args):
+            if arg not in by_type.get(typ, ()):
+                return _failure(index, step, f"'{arg}' is not a {typ} (parameter {var})")
+        binding = dict(zip((v for v, _ in params), args))
+        pre = [(a[0],) + tuple(binding.get(x, x) for x in a[1:]) for a in schema["pre"]]
+        missing = [a for a in pre if a not in state]
+        if missing:
+            return _failure(index, step, "precondition not satisfied", missing)
+        for a in schema["del"]:
+            state.discard((a[0],) + tuple(binding.get(x, x) for x in a[1:]))
+        for a in schema["add"]:
+            state.add((a[0],) + tuple(binding.get(x, x) for x in a[1:]))
+        if ordered:
+            reached = advance(reached)
+    if ordered:
+        if reached < len(goals):
+            return _failure(len(plan), None, f"goal {reached + 1} of {len(goals)} never reached in order",
+                            [goals[reached]])
+    else:
+        missing = [g for g in goals if g not in state]
+        if missing:
+            return _failure(len(plan), None, "goal not satisfied", missing)
+    return {"valid": True, "steps": len(plan)}
+
+
+def validate_text(domain_text, problem_text, plan, ordered=False):
+    """
+    Como validate, a partir de los textos PDDL (parseo memorizado). Lanza
+    PDDLParseError si el PDDL es inválido.
+    """
+    domain = _memo.get("domain", domain_text, _parse_domain)
+    problem = _memo.get("problem", problem_text, parse_problem)
+    return validate(domain, problem, plan, ordered)
+
+
+def validate_result(domain_text, problem_text, result, ordered=False):
+    """
+    Valida la respuesta de planner.solve ({status, result: {plan: [{name}]}}).
+    Salida: el informe de validate, o None si la respuesta no trae plan.
+    """
+    if result.get("status") != "ok":
+        return None
+    plan = [step["name"] for step in result["result"].get("plan", [])]
+    return validate_text(domain_text, problem_text, plan, ordered)